@@ -1,10 +1,59 @@
 import os
 import io
+import json
+import tempfile
+from functools import partial
+from importlib.machinery import ModuleSpec
 
-import altair as alt
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from analytics import CORRELATION_WEIGHTS, biggest_movers, correlation_matrix, indicator_matrix, strongest_pairs
+from charts import (
+    CHART_TYPES,
+    GRAPH_STYLES,
+    LAYOUTS,
+    MAP_LAYOUT,
+    THEMES,
+    axis_years,
+    choropleth_chart,
+    correlation_heatmap,
+    country_panel_chart,
+    indicator_chart,
+)
+from composites import (
+    COMPOSITE_DOMAIN,
+    definition_hash,
+    definition_key,
+    describe_composite,
+    evaluate_composite,
+    make_definition,
+)
+from data_loader import LoadCancelled, LoadJob, read_definitions
+from geo_store import available_levels, load_topology, match_countries, pick_level, subset_topology
+from data_view import PREVIEW_PAGE_SIZE, PREVIEW_SORT_COLUMNS, build_sort_index, get_page
+from report_export import write_report_package
+from shared_store import current_version, is_version, open_frame, open_version
+from search_index import SearchIndex, domain_index, related_items
+from sources import find_source, load_source, source_fingerprint, supported_extensions
+from intervals import CI_MODES, add_ci_columns, ci_columns, export_frame
+from timeseries import build_series, split_segments, years_by_question
+from warmup import (
+    DEFAULT_CORRELATION,
+    DEFAULT_SETTINGS,
+    is_ready,
+    view_key,
+    warm,
+    warming_in_progress,
+)
+
+# Streamlit runs this script as a __main__ module without a spec. Worker
+# processes started with 'spawn' (data_loader, report_export) would then
+# re-run the whole script to re-create it; a spec named __main__ tells
+# multiprocessing there is nothing to re-create.
+__spec__ = ModuleSpec("__main__", None)
+
 
 # -------------------------------------------------
 # Page setup
@@ -37,6 +86,19 @@ variable_info_md = "" # Deprecated, keeping empty variable just in case until fu
 # -------------------------------------------------
 # Load Indicator Definitions (External Excel)
 # -------------------------------------------------
+def definitions_path():
+    """Path of 'Indicator_Definitions.xlsx' (next to this script, else in the CWD), or None."""
+    # Resolve path relative to this script file
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    filename = os.path.join(script_dir, "Indicator_Definitions.xlsx")
+    if os.path.exists(filename):
+        return filename
+    # Fallback: Try just the filename in CWD (useful if __file__ is weird in some envs)
+    if os.path.exists("Indicator_Definitions.xlsx"):
+        return "Indicator_Definitions.xlsx"
+    return None
+
+
 @st.cache_data
 def load_definitions():
     """
@@ -45,210 +107,408 @@ def load_definitions():
         schema (dict): {Variable: {col: val, ...}}
         item_descs (dict): {Code: Description}
     """
-    # Resolve path relative to this script file
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    filename = os.path.join(script_dir, "Indicator_Definitions.xlsx")
-    
-    # Check if file exists
-    if not os.path.exists(filename):
-        # Fallback: Try just the filename in CWD (useful if __file__ is weird in some envs)
-        if os.path.exists("Indicator_Definitions.xlsx"):
-            filename = "Indicator_Definitions.xlsx"
-        else:
-             return {}, {}
+    filename = definitions_path()
+    if filename is None:
+        return {}, {}
 
     try:
-        # Load Schema
-        df_schema = pd.read_excel(filename, sheet_name="Schema")
-        df_schema["Variable"] = df_schema["Variable"].astype(str).str.strip()
-        
-        # Convert to dict keyed by Variable
-        # orient='index' gives {index: {col: val}}, so we set index first
-        schema = df_schema.set_index("Variable").to_dict(orient="index")
-
-        # Load Items
-        df_items = pd.read_excel(filename, sheet_name="Items")
-        df_items["Code"] = df_items["Code"].astype(str).str.strip()
-        df_items["Description"] = df_items["Description"].astype(str).str.strip()
-        
-        # Convert to dict {Code: Description}
-        item_descs = dict(zip(df_items["Code"], df_items["Description"]))
-        
-        return schema, item_descs
-        
+        return read_definitions(filename)
+
     except Exception as e:
         st.sidebar.error(f"Error loading definitions: {e}")
         return {}, {}
 
 def get_schema_dict():
     """Wrapper to return schema dict from cached loader."""
-    s, _ = load_definitions()
+    s, _ = get_definitions()
     return s
 
 def get_item_descriptions():
     """Wrapper to return items dict from cached loader."""
-    _, i = load_definitions()
+    _, i = get_definitions()
     return i
 
 # -------------------------------------------------
-# Load & reshape data (ResultswithSE.xlsx style)
+# Load data (ResultswithSE.xlsx style workbook, or a long CSV / Parquet / SQLite table)
 # -------------------------------------------------
-@st.cache_data
-def load_long_data(file_input, sheet: str = "Sheet1") -> pd.DataFrame:
+def load_long_data(file_input, _progress=None, _on_domains=None) -> tuple:
     """
-    Reads ResultswithSE.xlsx, where:
-    - col 0: Domain
-    - col 1: Question
-    - cols 2+: numeric triplets with 3 header rows:
-        row 1: Country
-        row 2: Year
-        row 3: 'Mean' / 'Standard Error of Mean' / 'Count'
-
-    Returns one row per (Domain, Question, Country, Year) with:
-        value = mean, se = standard error, n = sample size
+    Loads a path or an uploaded file through the matching source adapter
+    (see sources.py), cached by the source's fingerprint: an edited file on
+    disk is reloaded, an unchanged one is not, whatever its format.
+
+    _progress / _on_domains are passed to the adapter (not part of the cache
+    key); a LoadCancelled raised by _progress is not cached.
+
+    Returns:
+        long_df (DataFrame): one row per (Domain, Question, Country, Year, Sheet)
+            with value = mean, se = standard error, n = sample size
+        load_stats (DataFrame): per-sheet row counts and parse time
     """
+    source, name = source_of(file_input)
+    return load_source_data(source_fingerprint(source, name), name, source, _progress, _on_domains)
+
+
+def source_of(file_input) -> tuple:
+    """(source, name) of a path or an uploaded file, as the source adapters take them."""
+    if hasattr(file_input, "getvalue"):
+        # Uploaded files are passed on (e.g. to worker processes) as raw bytes
+        return file_input.getvalue(), file_input.name
+    return file_input, os.path.basename(file_input)
+
+
+@st.cache_data
+def load_source_data(fingerprint: str, name: str, _source, _progress=None, _on_domains=None) -> tuple:
+    """Cached body of load_long_data, keyed by fingerprint and name only."""
     try:
-        # Read without header; we’ll build headers manually
-        df = pd.read_excel(file_input, sheet_name=sheet, header=None)
-
-        # Header rows for numeric columns (starting from column index 2)
-        # Search for the header row containing "DOMAIN" in the first column
-        header_idx = -1
-        for i in range(min(20, len(df))):
-            val = str(df.iloc[i, 0]).strip().upper()
-            if val == "DOMAIN":
-                header_idx = i
-                break
-        
-        if header_idx == -1:
-            # Fallback for flexibility: try to find "Standard Error" or "Count" in any row
-            for i in range(min(20, len(df))):
-                row_vals = df.iloc[i].astype(str).str.lower().tolist()
-                if any("standard error" in x for x in row_vals) or any("count" in x for x in row_vals):
-                    header_idx = i
-                    break
-        
-        if header_idx < 2:
-            st.error("Could not detect header rows (Country/Year/Stats) correctly.")
-            return pd.DataFrame()
-
-        # Define offsets relative to the main header row
-        # Row [header_idx]: DOMAIN | Question | ... Stats ...
-        # Row [header_idx - 1]: Years
-        # Row [header_idx - 2]: Countries
-        
-        stat_row = df.iloc[header_idx, 2:]
-        year_row = df.iloc[header_idx - 1, 2:]
-        country_row = df.iloc[header_idx - 2, 2:]
-        
-        # Data starts immediately after the header row
-        data = df.iloc[header_idx + 1:].reset_index(drop=True)
-        data = data.rename(columns={0: "Domain", 1: "Question"})
-
-        # Melt numeric columns
-        value_cols = data.columns[2:]
-        long = data.melt(
-            id_vars=["Domain", "Question"],
-            value_vars=value_cols,
-            var_name="col_idx",
-            value_name="raw_value",
-        )
+        return load_source(_source, name=name, progress=_progress, on_domains=_on_domains)
+
+    except LoadCancelled:
+        raise
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+
+
+# -------------------------------------------------
+# Shared dataset mode (several server processes)
+# -------------------------------------------------
+# With RT_SHARED_DATA_DIR set, the bundled workbook is parsed by one process
+# and published as a memory-mapped Arrow file (see shared_store.py); every
+# server process maps that file read-only instead of parsing its own copy.
+# The publishing process is the one holding the WARMING marker (warmup.py,
+# at deploy time or from the first worker that finds no current version);
+# the others wait for it.
+SHARED_DATA_DIR = os.environ.get("RT_SHARED_DATA_DIR")
+
+
+@st.cache_resource(max_entries=2)
+def open_shared_dataset(version: str) -> tuple:
+    """Maps a published version once per process: (long_df, manifest)."""
+    return open_version(SHARED_DATA_DIR, version)
+
+
+def get_shared_version(path: str) -> str:
+    """
+    Live shared version for the workbook at path. If it is missing or stale,
+    this process publishes it when it wins the WARMING marker; otherwise the
+    script run waits for the process that did (see wait_for_shared_data).
+    """
+    fingerprint = source_fingerprint(path)
+    version = current_version(SHARED_DATA_DIR)
+    if version is not None and open_shared_dataset(version)[1]["fingerprint"] == fingerprint:
+        return version
+    version = warm(path, SHARED_DATA_DIR, definitions_path())
+    if version is None:
+        wait_for_shared_data(path)
+    return version
+
+
+def wait_for_shared_data(path: str):
+    """Shows a notice and stops the script run until the publishing process has finished."""
+    st.info("⏳ The dashboard is warming up; it will open as soon as the data is ready.")
+    wait_for_warmup(path)
+    st.stop()
+
+
+def get_dataset(file_input) -> tuple:
+    """
+    The dataset behind file_input: mapped from the shared store for the
+    bundled workbook when shared mode is on, otherwise from load_long_data.
+
+    Returns:
+        data_key (str): the shared version, or else the source fingerprint.
+            Every cache derived from the dataset is keyed by it (the frame
+            itself is passed unhashed), so they all follow a changed file.
+        long_df (DataFrame), load_stats (DataFrame): as from load_long_data
+    """
+    if SHARED_DATA_DIR and isinstance(file_input, str):
+        version = get_shared_version(file_input)
+        long_df, manifest = open_shared_dataset(version)
+        return version, long_df, pd.DataFrame(manifest["load_stats"])
+    source, name = source_of(file_input)
+    fingerprint = source_fingerprint(source, name)
+    return (fingerprint, *load_source_data(fingerprint, name, source))
+
+
+def get_warm_artifact(data_key: str, name: str):
+    """A pre-built artifact (see warmup.py) of the shared version data_key, or None."""
+    if SHARED_DATA_DIR and is_version(data_key):
+        return open_shared_dataset(data_key)[1].get(name)
+    return None
+
+
+def get_warm_frame(data_key: str, name: str):
+    """A pre-built frame (see warmup.WARM_FRAMES) of the shared version data_key, mapped read-only, or None."""
+    if name in (get_warm_artifact(data_key, "frames") or []):
+        return open_frame(SHARED_DATA_DIR, data_key, name)
+    return None
+
+
+def is_default_series(interpolate: bool, domain: str) -> bool:
+    """True for the series settings the warm-up builds (whole dataset, default interpolation)."""
+    return domain is None and interpolate == DEFAULT_SETTINGS["interpolate"]
+
+
+@st.cache_data
+def load_domain_index(data_key: str, _long_df: pd.DataFrame) -> dict:
+    return domain_index(_long_df)
+
+
+def get_domain_index(data_key: str, long_df: pd.DataFrame) -> dict:
+    """{Domain: sorted questions}: pre-built by the warm-up when available."""
+    return get_warm_artifact(data_key, "domain_index") or load_domain_index(data_key, long_df)
+
+
+def get_definitions() -> tuple:
+    """(schema, item_descs), from the shared store when one is published."""
+    if SHARED_DATA_DIR:
+        version = current_version(SHARED_DATA_DIR)
+        if version is not None:
+            manifest = open_shared_dataset(version)[1]
+            return manifest["schema"], manifest["item_descs"]
+    return load_definitions()
+
+
+@st.cache_resource(max_entries=8)
+def load_series(data_key: str, _long_df: pd.DataFrame, interpolate: bool, domain: str, sheets: tuple) -> tuple:
+    """
+    Builds the per-(Question, Country) series frame once per dataset and
+    interpolation setting (see timeseries.build_series), with the bounds of
+    every error bar mode precomputed (see intervals.add_ci_columns). Lines
+    are not broken here: the max_gap setting is applied to the plotted slice
+    (see timeseries.split_segments).
+
+    With domain and sheets, only that domain's rows from those sheets are
+    used, so gaps, segments and interpolation ignore deselected waves; pass
+    None, None for the whole dataset. Both are required so every caller
+    passes the same arguments (st.cache_* keys an omitted default apart
+    from the same value passed explicitly).
+
+    A shared resource, not cache_data: the frame is only ever read, and
+    reruns slice it in place instead of unpickling a copy each time.
+
+    Returns:
+        series_df (DataFrame): long frame ordered by series, with segment / interpolated flags
+        wave_years (dict): {Question: sorted wave years} for axis ticks
+    """
+    if is_default_series(interpolate, domain):
+        prebuilt = get_warm_frame(data_key, "series")
+        if prebuilt is not None:
+            return prebuilt, get_warm_artifact(data_key, "wave_years")
+    long_df = _long_df
+    if domain is not None:
+        long_df = long_df[(long_df["Domain"] == domain) & long_df["Sheet"].isin(sheets)]
+    series_df = build_series(long_df, interpolate=interpolate)
+    series_df = add_ci_columns(series_df)
+    return series_df, years_by_question(series_df)
+
+
+@st.cache_data
+def load_movers(data_key: str, _long_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Trend and wave-to-wave jump ranking of every (Question, Country) series
+    in the dataset (see analytics.biggest_movers), computed once per dataset.
+    """
+    prebuilt = get_warm_frame(data_key, "movers")
+    if prebuilt is not None:
+        return prebuilt
+    series_df, _ = load_series(data_key, _long_df, False, None, None)
+    return biggest_movers(series_df)
+
+
+@st.cache_data
+def load_indicator_matrix(data_key: str, _long_df: pd.DataFrame) -> dict:
+    """Country-Year x Question matrices of the dataset (see analytics.indicator_matrix), pivoted once."""
+    if get_warm_frame(data_key, "matrix_value") is not None:
+        return {key: get_warm_frame(data_key, f"matrix_{key}") for key in ("value", "n", "se")}
+    return indicator_matrix(_long_df)
+
+
+@st.cache_data
+def load_correlations(data_key: str, _long_df: pd.DataFrame, weight: str, min_periods: int) -> tuple:
+    """
+    Correlations between all indicators of the dataset (see
+    analytics.correlation_matrix), from the shared pivot.
+    Returns (corr, pairs).
+    """
+    if {"weight": weight, "min_periods": min_periods} == DEFAULT_CORRELATION:
+        corr = get_warm_frame(data_key, "correlations")
+        if corr is not None:
+            return corr, get_warm_frame(data_key, "correlation_pairs")
+    return correlation_matrix(load_indicator_matrix(data_key, _long_df), weight, min_periods)
+
+
+HEATMAP_MAX_INDICATORS = 60
+
+
+def go_to_mover(movers: pd.DataFrame):
+    """on_select callback of the movers table: opens the picked series' chart."""
+    rows = st.session_state["movers-table"].selection.rows
+    if not rows:
+        return
+    pick = movers.iloc[rows[0]]
+    # Clear the search, so the picked domain is among the Domain options
+    st.session_state.search_query = ""
+    st.session_state.selected_domain_key = pick["Domain"]
+    st.session_state.selected_questions_key = [pick["Question"]]
+    st.session_state.mover_focus = (pick["Domain"], pick["Country"])
+    st.toast(f"Showing {pick['Question']} ({pick['Country']})")
+
+
+@st.cache_resource
+def load_boundaries(level: str) -> dict:
+    """Bundled country boundaries at one simplification level (see geo_store), parsed once."""
+    return load_topology(level)
+
+
+@st.cache_data
+def load_map_topology(level: str, isos: tuple) -> dict:
+    """The boundaries of just the mapped countries, so map specs stay small."""
+    return subset_topology(load_boundaries(level), isos)
+
+
+@st.cache_resource
+def load_search_index(data_key: str, _long_df: pd.DataFrame) -> SearchIndex:
+    """Indicator search index over the dataset's questions and their definitions, built once."""
+    prebuilt = get_warm_artifact(data_key, "search_index")
+    if prebuilt is not None:
+        return SearchIndex.from_dict(prebuilt)
+    schema, item_descs = get_definitions()
+    return SearchIndex(get_domain_index(data_key, _long_df), schema, item_descs)
+
+
+@st.cache_resource(max_entries=8)
+def load_sort_index(data_key: str, _long_df: pd.DataFrame, interpolate: bool, domain: str, sheets: tuple) -> dict:
+    """
+    Per-column row ranks of the series frame, used by the paged data preview.
+    Kept as a shared resource: read-only, so reruns use it without a copy.
+    """
+    if is_default_series(interpolate, domain):
+        prebuilt = get_warm_frame(data_key, "sort_index")
+        if prebuilt is not None:
+            return {col: prebuilt[col].to_numpy() for col in prebuilt.columns}
+    series_df, _ = load_series(data_key, _long_df, interpolate, domain, sheets)
+    return build_sort_index(series_df, PREVIEW_SORT_COLUMNS)
+
 
-        # Map each column index to (Country, Year, stat label)
-        def map_meta(col_idx):
-            c = country_row[col_idx]
-            y = year_row[col_idx]
-            s = stat_row[col_idx]
-            return c, y, s
-
-        meta = long["col_idx"].apply(map_meta)
-        meta_df = pd.DataFrame(meta.tolist(), columns=["Country", "Year", "stat_label"])
-        long = pd.concat([long, meta_df], axis=1)
-
-        # Normalise stat labels → mean / se / n
-        def normalize_stat(label):
-            if isinstance(label, str):
-                l = label.lower()
-                if "standard error" in l:
-                    return "se"
-                if "count" in l:
-                    return "n"
-                if "mean" in l:
-                    return "mean"
-            return "value"
-
-        long["stat"] = long["stat_label"].apply(normalize_stat)
-
-        # Clean labels
-        long["Domain"] = long["Domain"].astype(str).str.strip()
-        long["Question"] = long["Question"].astype(str).str.strip()
-
-        # Convert value to numeric, coercing errors (like strings) to NaN
-        long["raw_value"] = pd.to_numeric(long["raw_value"], errors='coerce')
-
-        # Drop rows with no data
-        long = long.dropna(subset=["raw_value"])
-
-        # Pivot stats to columns
-        wide = (
-            long.pivot_table(
-                index=["Domain", "Question", "Country", "Year"],
-                columns="stat",
-                values="raw_value",
-                aggfunc="first",
+@st.cache_data
+def load_composite(data_key: str, _long_df: pd.DataFrame, composite_key: str) -> pd.DataFrame:
+    """One composite index evaluated over the whole dataset, memoized by its definition."""
+    return evaluate_composite(_long_df, json.loads(composite_key))
+
+
+@st.cache_resource(max_entries=4)
+def load_composite_series(data_key: str, _long_df: pd.DataFrame, composite_keys: tuple,
+                          interpolate: bool) -> tuple:
+    """
+    Series frame of the custom composites, built like load_series.
+    Returns (series_df, wave_years, sort_index).
+    """
+    long_df = pd.concat([load_composite(data_key, _long_df, k) for k in composite_keys], ignore_index=True)
+    series_df = add_ci_columns(build_series(long_df, interpolate=interpolate))
+    return (
+        series_df,
+        years_by_question(series_df),
+        build_sort_index(series_df, PREVIEW_SORT_COLUMNS),
+    )
+
+
+def wait_for_background_load(uploaded_file):
+    """
+    Parses an uploaded data file in a background LoadJob (one per file and session).
+    Until it finishes, shows progress with a cancel button and a Domain preview
+    in the sidebar, then stops the script run; the finished load is picked up
+    from the load_long_data cache, and the job (holding its own copy of the
+    result) is dropped.
+    """
+    loaded = st.session_state.setdefault("loaded_uploads", set())
+    if uploaded_file.file_id in loaded:
+        return
+
+    job_key = f"load_job_{uploaded_file.file_id}"
+    job = st.session_state.get(job_key)
+    if job is None:
+        job = LoadJob(
+            lambda job: load_long_data(
+                uploaded_file, _progress=job.report, _on_domains=job.set_domains
             )
-            .reset_index()
         )
+        st.session_state[job_key] = job
+
+    if job.done and job.result is not None:
+        loaded.add(uploaded_file.file_id)
+        del st.session_state[job_key]
+        return
+
+    if job.cancelled:
+        st.info("Loading cancelled. Upload another file, or re-upload to retry.")
+        if st.button("Retry loading"):
+            del st.session_state[job_key]
+            st.rerun()
+        st.stop()
 
-        # Flatten column index
-        wide.columns = [str(c) for c in wide.columns]
+    if job.error is not None:
+        st.error(f"Error loading data: {job.error}")
+        st.stop()
 
-        # Rename mean column to value
-        if "mean" in wide.columns:
-            wide = wide.rename(columns={"mean": "value"})
+    # Domains are known before parsing finishes; keep the user's pick for later
+    if job.domains:
+        st.session_state.preferred_domain = st.sidebar.selectbox(
+            "Domain (loading…)", job.domains
+        )
+
+    show_load_progress(job, len(job.domains))
+    st.stop()
 
-        # Drop rows where value is missing (crucial for line charts)
-        if "value" in wide.columns:
-            wide = wide.dropna(subset=["value"])
 
-        # Ensure Year is numeric
-        wide["Year"] = wide["Year"].astype(int)
-        
-        # Sort by Year to ensure line order
-        wide = wide.sort_values(by=["Country", "Year"])
+@st.fragment(run_every=0.5)
+def show_load_progress(job, shown_domains: int):
+    """Polls a LoadJob; reruns the whole app when it finishes or finds new domains."""
+    if job.done or len(job.domains) != shown_domains:
+        st.rerun()
+    st.progress(job.fraction, text=f"Loading data: {job.stage} ({job.fraction:.0%})")
+    if st.button("Cancel loading"):
+        job.cancel()
+        st.rerun()
 
-        return wide
 
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+@st.fragment(run_every=2)
+def wait_for_warmup(path: str):
+    """Polls the warm-up; reruns the whole app once it has finished."""
+    if is_ready(SHARED_DATA_DIR, path) or not warming_in_progress(SHARED_DATA_DIR):
+        st.rerun()
 
 
-# Check if default file exists (case-insensitive search)
+# Default dataset in the current directory (case-insensitive), in the fastest
+# available format: e.g. a ResultswithSE.parquet converted from the workbook
+# with `python sources.py ResultswithSE.xlsx ResultswithSE.parquet`
 default_filename = "ResultswithSE.xlsx"
-data_source = None
-
-# Try exact match first
-if os.path.exists(default_filename):
-    data_source = default_filename
-else:
-    # Try case-insensitive match in current directory
-    files = [f for f in os.listdir(".") if os.path.isfile(f)]
-    for f in files:
-        if f.lower() == default_filename.lower():
-            data_source = f
-            break
+data_source = find_source(".", os.path.splitext(default_filename)[0])
 
 if not data_source:
     st.warning(
         f"⚠️ '{default_filename}' not found in the current directory. Please upload the data file."
     )
-    uploaded_file = st.sidebar.file_uploader("Upload Data File", type=["xlsx"])
+    uploaded_file = st.sidebar.file_uploader(
+        "Upload Data File", type=[ext.lstrip(".") for ext in supported_extensions()]
+    )
     if uploaded_file:
         data_source = uploaded_file
+        wait_for_background_load(uploaded_file)
+
+if (
+    SHARED_DATA_DIR
+    and isinstance(data_source, str)
+    and warming_in_progress(SHARED_DATA_DIR)
+    and not is_ready(SHARED_DATA_DIR, data_source)
+):
+    # Another process (warmup.py or a worker) is building the caches: wait
+    # for it rather than parsing the same data again in this process
+    wait_for_shared_data(data_source)
 
 if data_source:
-    long_df = load_long_data(data_source)
+    data_key, long_df, load_stats = get_dataset(data_source)
     if long_df.empty:
         st.error("Data loading failed or returned empty dataset.")
         st.stop()
@@ -264,19 +524,61 @@ st.sidebar.header("⚙️ Configuration")
 
 # --- Data Selection ---
 with st.sidebar.expander("1. Data Selection", expanded=True):
+    # Search across all domains (names, definitions and constituent items)
+    search_query = st.text_input(
+        "🔍 Search indicators", placeholder="e.g. bribe, trust, F117", key="search_query"
+    )
+    domains = list(get_domain_index(data_key, long_df))
+
+    # Custom composites (built in "3. Composite Indices") form their own domain
+    composites = st.session_state.get("composites", {})
+    composite_keys = tuple(definition_key(d) for d in composites.values())
+    if composites:
+        domains.append(COMPOSITE_DOMAIN)
+
+    search_hits = None
+    if search_query.strip():
+        search_index = load_search_index(data_key, long_df)
+        search_hits = search_index.search(search_query)
+        hit_domains = {d for q in search_hits for d in search_index.domains[q]}
+        if search_hits:
+            domains = [d for d in domains if d in hit_domains]
+            st.caption(f"🔍 {len(search_hits)} indicator(s) in {len(domains)} domain(s)")
+        else:
+            st.caption("🔍 No matching indicators; showing all.")
+            search_hits = None
+
     # Domain
-    domains = sorted(long_df["Domain"].unique())
-    selected_domain = st.selectbox("Domain", domains)
+    preferred_domain = st.session_state.get("preferred_domain")
+    selected_domain = st.selectbox(
+        "Domain",
+        domains,
+        index=domains.index(preferred_domain) if preferred_domain in domains else 0,
+        key="selected_domain_key",
+    )
+
+    if selected_domain == COMPOSITE_DOMAIN:
+        dom_df = load_composite_series(data_key, long_df, composite_keys, False)[0]
+    else:
+        dom_df = long_df[long_df["Domain"] == selected_domain]
 
-    dom_df = long_df[long_df["Domain"] == selected_domain]
+    # Sheets / waves (only shown for multi-sheet workbooks)
+    dom_sheets = sorted(dom_df["Sheet"].unique())
+    selected_sheets = dom_sheets
+    if len(dom_sheets) > 1:
+        selected_sheets = st.multiselect("Sheets / waves", dom_sheets, default=dom_sheets)
+        dom_df = dom_df[dom_df["Sheet"].isin(selected_sheets)]
 
     # Show availability info
     avail_years = sorted(dom_df["Year"].unique())
     if avail_years:
         st.caption(f"📅 Data available: {min(avail_years)} - {max(avail_years)}")
 
-    # Questions within domain
+    # Questions within domain (search matches only, best first)
     questions = sorted(dom_df["Question"].unique())
+    if search_hits is not None:
+        dom_questions = set(questions)
+        questions = [q for q in search_hits if q in dom_questions]
 
     # --- Select All / Clear All Buttons ---
     c_all, c_clear = st.columns(2)
@@ -309,12 +611,16 @@ with st.sidebar.expander("1. Data Selection", expanded=True):
             key="selected_questions_key",
         )
 
-    # Countries
+    # Countries (just the picked series' country after a click in Biggest Movers,
+    # until the domain changes)
     countries = sorted(dom_df["Country"].unique())
+    focus = st.session_state.get("mover_focus")
+    if focus is not None and focus[0] != selected_domain:
+        focus = st.session_state.mover_focus = None
     selected_countries = st.multiselect(
         "Countries",
         countries,
-        default=countries,
+        default=[focus[1]] if focus is not None and focus[1] in countries else countries,
     )
 
     # Year range
@@ -335,20 +641,28 @@ with st.sidebar.expander("2. Visual Settings", expanded=False):
     # Chart Type
     chart_type = st.selectbox(
         "Chart Type",
-        ["Line Chart", "Bar Chart"],
+        CHART_TYPES,
         index=0,
     )
 
     # Layout
+    # Maps need the offline boundaries (built with geo_store.py)
     layout = st.radio(
         "Plot layout",
-        ["Single figure (all countries)", "Country panels"],
+        LAYOUTS + [MAP_LAYOUT] if available_levels() else LAYOUTS,
         index=0,
     )
 
+    # Map: one year, each country's latest wave up to it (None: no wave in the year range)
+    map_year = None
+    if layout == MAP_LAYOUT:
+        map_years = [y for y in years if selected_year_range[0] <= y <= selected_year_range[1]]
+        if map_years:
+            map_year = st.select_slider("Map year (latest wave up to)", map_years, value=map_years[-1])
+
     # Show column control if we are faceting (either by country or by indicator)
     show_grid_control = (layout == "Country panels") or (
-        layout == "Single figure (all countries)" and len(selected_questions) > 1
+        layout != "Country panels" and len(selected_questions) > 1
     )
 
     grid_columns = 2
@@ -358,29 +672,14 @@ with st.sidebar.expander("2. Visual Settings", expanded=False):
     # Graph style
     graph_style = st.selectbox(
         "Graph style",
-        [
-            "Colorblind-safe (default)",
-            "Vibrant (Tableau 10)",
-            "Pastel (Soft)",
-            "Earth Tones (Muted)",
-            "Monochrome (blue shades)",
-            "Black & white (line styles)",
-            "Highlight focal country",
-        ],
+        GRAPH_STYLES,
         index=0,
     )
 
     # Theme presets
     theme = st.selectbox(
         "Theme preset",
-        [
-            "Academic (light)",
-            "OECD grey",
-            "Dark dashboard",
-            "Pastel report",
-            "The Economist",
-            "Financial Times",
-        ],
+        THEMES,
         index=0,
     )
 
@@ -396,10 +695,62 @@ with st.sidebar.expander("2. Visual Settings", expanded=False):
     # Error Bar Settings
     error_bar_type = st.selectbox(
         "Error Bars / Confidence Intervals",
-        ["95% Confidence Interval", "Standard Error", "None"],
+        list(CI_MODES) + ["None"],
         index=0
     )
 
+    # Wave gaps (line charts only)
+    max_gap, interpolate = 0, False
+    if chart_type == "Line Chart":
+        max_gap = st.slider("Break lines at gaps longer than (years, 0 = never)", 0, 20, 0)
+        interpolate = st.checkbox("Interpolate between waves", value=False)
+
+# --- Composite Indices ---
+with st.sidebar.expander("3. Composite Indices", expanded=False):
+    st.caption(f"Weighted combinations of stored indicators, listed under '{COMPOSITE_DOMAIN}'.")
+    comp_name = st.text_input("Name", placeholder="e.g. Civic engagement")
+    stored_questions = sorted(long_df["Question"].unique())
+    comp_parts = st.multiselect("Components", stored_questions)
+    comp_weights = {
+        q: st.number_input(f"Weight: {q}", value=1.0, step=0.5, key=f"composite-w-{q}")
+        for q in comp_parts
+    }
+    comp_standardize = st.checkbox("Standardize components (z-scores)", value=True)
+    comp_normalize = st.checkbox("Weighted mean (divide by sum of |weights|)", value=True)
+
+    if st.button("Add composite", disabled=not (comp_name.strip() and comp_parts)):
+        try:
+            if comp_name.strip() in stored_questions:
+                raise ValueError(f"'{comp_name.strip()}' is a stored indicator; choose another name.")
+            definition = make_definition(comp_name, comp_weights, comp_standardize, comp_normalize)
+            # Evaluated (and memoized) now, so data problems show here rather than in the chart
+            load_composite(data_key, long_df, definition_key(definition))
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            # Redefining a name replaces it
+            st.session_state.composites = {**composites, definition["name"]: definition}
+            st.rerun()
+
+    for name, definition in composites.items():
+        c_label, c_remove = st.columns([4, 1])
+        c_label.caption(f"**{name}**: {describe_composite(definition)['Method']}")
+        if c_remove.button("✕", key=f"composite-remove-{definition_hash(definition)}"):
+            st.session_state.composites = {k: v for k, v in composites.items() if k != name}
+            st.rerun()
+
+# --- Load Report ---
+with st.sidebar.expander("ℹ️ Load report", expanded=False):
+    st.caption(
+        f"{len(load_stats)} sheet(s), {int(load_stats['Rows'].sum())} rows, "
+        f"{load_stats['Seconds'].sum():.2f}s total parse time"
+    )
+    st.dataframe(
+        load_stats.style.format({"Seconds": "{:.2f}"}),
+        hide_index=True,
+        width="stretch",
+    )
+
 
 # -------------------------------------------------
 # Filtered data for plotting
@@ -408,34 +759,35 @@ if not selected_questions or not selected_countries:
     st.warning("Please select at least one indicator and one country.")
     st.stop()
 
-plot_df = dom_df[
-    (dom_df["Question"].isin(selected_questions))
-    & (dom_df["Country"].isin(selected_countries))
-    & (dom_df["Year"].between(selected_year_range[0], selected_year_range[1]))
+if selected_domain == COMPOSITE_DOMAIN:
+    series_df, wave_years, sort_index = load_composite_series(
+        data_key, long_df, composite_keys, interpolate
+    )
+else:
+    # With sheets deselected, the domain's series are rebuilt without them
+    # (interpolation must not run towards hidden waves)
+    subset = (None, None)
+    if len(selected_sheets) < len(dom_sheets):
+        subset = (selected_domain, tuple(selected_sheets))
+    series_df, wave_years = load_series(data_key, long_df, interpolate, *subset)
+    sort_index = load_sort_index(data_key, long_df, interpolate, *subset)
+
+selection = series_df[
+    (series_df["Domain"] == selected_domain)
+    & (series_df["Sheet"].isin(selected_sheets))
+    & (series_df["Question"].isin(selected_questions))
+    & (series_df["Country"].isin(selected_countries))
+    & (series_df["Year"].between(selected_year_range[0], selected_year_range[1]))
 ]
+# Only the selection is re-segmented for the gap setting (the dataset frame is shared)
+plot_df = split_segments(selection, max_gap)
 
 if plot_df.empty:
     st.warning("No data for this combination. Try widening the year range or adding countries.")
     st.stop()
 
-# Calculate error bars / CI
-if "se" in plot_df.columns:
-    if error_bar_type == "95% Confidence Interval":
-        z_mult = 1.96
-    elif error_bar_type == "Standard Error":
-        z_mult = 1.0
-    else:
-        z_mult = 0.0
-        
-    if error_bar_type != "None":
-        plot_df["ci_low"] = plot_df["value"] - z_mult * plot_df["se"]
-        plot_df["ci_high"] = plot_df["value"] + z_mult * plot_df["se"]
-    else:
-        plot_df["ci_low"] = pd.NA
-        plot_df["ci_high"] = pd.NA
-else:
-    plot_df["ci_low"] = pd.NA
-    plot_df["ci_high"] = pd.NA
+# Error bars / CI: bounds are precomputed on the dataset, charts just pick the columns
+ci_cols = ci_columns(error_bar_type)
 
 # Check for missing countries
 present_countries = set(plot_df["Country"].unique())
@@ -465,206 +817,13 @@ with tab1:
     # --- 2. Chart Section ---
     st.subheader(f"📈 Analysis: {selected_domain}")
 
-    # --- Style helpers ---
-    def get_country_color_encoding():
-        """Color mapping for countries, depending on graph style."""
-        if graph_style == "Colorblind-safe (default)":
-            palette = [
-                "#1b9e77",
-                "#d95f02",
-                "#7570b3",
-                "#e7298a",
-                "#66a61e",
-                "#e6ab02",
-                "#a6761d",
-                "#666666",
-            ]
-            return alt.Color(
-                "Country:N",
-                title="Country",
-                scale=alt.Scale(range=palette),
-            )
-
-        if graph_style == "Vibrant (Tableau 10)":
-            # Tableau 10 standard
-            palette = [
-                "#4e79a7", "#f28e2b", "#e15759", "#76b7b2", "#59a14f",
-                "#edc948", "#b07aa1", "#ff9da7", "#9c755f", "#bab0ac"
-            ]
-            return alt.Color("Country:N", title="Country", scale=alt.Scale(range=palette))
-
-        if graph_style == "Pastel (Soft)":
-            # Brewer Pastel1 + Pastel2 mix
-            palette = [
-                "#fbb4ae", "#b3cde3", "#ccebc5", "#decbe4", "#fed9a6",
-                "#ffffcc", "#e5d8bd", "#fddaec", "#f2f2f2"
-            ]
-            return alt.Color("Country:N", title="Country", scale=alt.Scale(range=palette))
-
-        if graph_style == "Earth Tones (Muted)":
-            # Muted earth tones
-            palette = [
-                "#8c564b", "#c49c94", "#7f7f7f", "#c7c7c7", "#bcbd22",
-                "#dbdb8d", "#17becf", "#9edae5"
-            ]
-            return alt.Color("Country:N", title="Country", scale=alt.Scale(range=palette))
-
-        if graph_style == "Monochrome (blue shades)":
-            return alt.Color(
-                "Country:N",
-                title="Country",
-                scale=alt.Scale(scheme="blues"),
-            )
-
-        if graph_style == "Highlight focal country" and focal_country is not None:
-            return alt.condition(
-                alt.datum.Country == focal_country,
-                alt.value("#1f77b4"),  # highlight
-                alt.value("#CCCCCC"),  # others
-            )
-
-        return alt.value("black")
-
-    def get_stroke_dash_encoding():
-        """Line style mapping (used for black & white)."""
-        if graph_style == "Black & white (line styles)":
-            return alt.StrokeDash(
-                "Country:N",
-                title="Country",
-                sort=selected_countries,
-            )
-        return alt.value([1, 0])
-
-    def style_chart(chart: alt.Chart) -> alt.Chart:
-        """Apply theme preset: fonts, fill, grid, legend, etc."""
-        chart = (
-            chart.configure_axis(labelFontSize=13, titleFontSize=15)
-            .configure_legend(titleFontSize=14, labelFontSize=12)
-            .configure_title(fontSize=18, anchor="start")
-        )
-
-        if theme == "Academic (light)":
-            chart = chart.configure_view(strokeWidth=0, fill="white").configure_axis(
-                grid=True, gridColor="#DDDDDD"
-            )
-        elif theme == "OECD grey":
-            chart = chart.configure_view(
-                stroke="#CCCCCC", strokeWidth=1, fill="white"
-            ).configure_axis(grid=True, gridColor="#E0E0E0")
-        elif theme == "Dark dashboard":
-            chart = (
-                chart.configure_view(strokeWidth=0, fill="#111111")
-                .configure_axis(
-                    labelColor="white",
-                    titleColor="white",
-                    grid=True,
-                    gridColor="#333333",
-                )
-                .configure_legend(titleColor="white", labelColor="white")
-                .configure_title(color="white")
-            )
-        elif theme == "Pastel report":
-            chart = chart.configure_view(strokeWidth=0, fill="#FAFAFA").configure_axis(
-                grid=True, gridColor="#F0F0F0"
-            )
-        elif theme == "The Economist":
-            chart = chart.configure_view(strokeWidth=0, fill="#d5e4eb").configure_axis(
-                grid=True,
-                gridColor="white",
-                labelFont="Verdana",
-                titleFont="Verdana",
-            ).configure_title(font="Verdana", fontSize=20).configure_legend(
-                labelFont="Verdana", titleFont="Verdana"
-            )
-        elif theme == "Financial Times":
-            chart = chart.configure_view(strokeWidth=0, fill="#fff1e0").configure_axis(
-                grid=True,
-                gridColor="#e3cbb0",
-                labelFont="Georgia",
-                titleFont="Georgia",
-            ).configure_title(font="Georgia", fontSize=20).configure_legend(
-                labelFont="Georgia", titleFont="Georgia"
-            )
-
-        return chart
-
-    color_encoding = get_country_color_encoding()
-    stroke_dash_encoding = get_stroke_dash_encoding()
-
-    # --- Plotting Logic ---
-    def create_single_chart(
-        data: pd.DataFrame,
-        title_text: str,
-        x_axis_title: str = "Year",
-        y_axis_title: str = "Value",
-        color_enc=None,
-        dash_enc=None,
-        x_off=None,
-        show_ci_flag: bool = True,
-        height: int = 450,
-    ) -> alt.Chart:
-        
-        # Determine unique years for the axis ticks
-        chart_years = sorted(data["Year"].dropna().unique().astype(int))
-        
-        base = alt.Chart(data)
-
-        # Main layer: bar or line
-        if chart_type == "Bar Chart":
-            main_mark = base.mark_bar()
-        else:
-            main_mark = base.mark_line(point=True)
-
-        main = main_mark.encode(
-            x=alt.X("Year:Q", title=x_axis_title, axis=alt.Axis(format="04d", values=chart_years)),
-            y=alt.Y("value:Q", title=y_axis_title),
-            color=color_enc,
-            strokeDash=dash_enc,
-            xOffset=x_off,
-            tooltip=[
-                "Country",
-                "Year",
-                "Question",
-                alt.Tooltip("value:Q", title="Mean"),
-                alt.Tooltip("se:Q", title="SE", format=".3f"),
-                alt.Tooltip("n:Q", title="N"),
-                alt.Tooltip("ci_low:Q", title="CI low", format=".3f"),
-                alt.Tooltip("ci_high:Q", title="CI high", format=".3f"),
-            ],
-            order="Year",
-        )
-
-        layers = [main]
-
-        # Optional CI layer
-        if (
-            show_ci_flag
-            and "ci_low" in data.columns
-            and "ci_high" in data.columns
-            and data["ci_low"].notna().any()
-        ):
-            if chart_type == "Bar Chart":
-                err = base.mark_errorbar().encode(
-                    x=alt.X("Year:Q", title=x_axis_title, axis=alt.Axis(format="04d", values=chart_years)),
-                    y=alt.Y("ci_low:Q", title=y_axis_title),
-                    y2="ci_high:Q",
-                    color=color_enc,
-                    xOffset=x_off,
-                )
-            else:
-                err = base.mark_errorband(opacity=0.2).encode(
-                    x=alt.X("Year:Q", title=x_axis_title, axis=alt.Axis(format="04d", values=chart_years)),
-                    y=alt.Y("ci_low:Q", title=y_axis_title),
-                    y2="ci_high:Q",
-                    color=color_enc,
-                )
-            layers.insert(0, err)
-
-        chart = alt.layer(*layers).properties(
-            title=title_text,
-            height=height,  # Dynamic height
-        )
-        return style_chart(chart)
+    # Shared chart settings
+    chart_kwargs = dict(
+        chart_type=chart_type,
+        theme=theme,
+        ci_cols=ci_cols,
+        interpolate=interpolate,
+    )
 
     # Layouts
     if layout == "Single figure (all countries)":
@@ -673,67 +832,183 @@ with tab1:
             cols = st.columns(grid_columns)
             for i, q in enumerate(selected_questions):
                 q_data = plot_df[plot_df["Question"] == q]
-                chart = create_single_chart(
+                chart = indicator_chart(
                     q_data,
                     title_text=f"{q}",
-                    y_axis_title="Value",
-                    color_enc=color_encoding,
-                    dash_enc=stroke_dash_encoding
-                    if chart_type == "Line Chart"
-                    else alt.value([0, 0]),
-                    x_off="Country:N" if chart_type == "Bar Chart" else alt.value(0),
-                    show_ci_flag=(error_bar_type != "None"),
+                    graph_style=graph_style,
+                    chart_years=axis_years([q], wave_years, selected_year_range),
+                    countries=selected_countries,
+                    focal_country=focal_country,
+                    **chart_kwargs,
                 )
                 with cols[i % grid_columns]:
                     st.altair_chart(chart, width="stretch")
         else:
-            # One indicator -> single chart
-            chart = create_single_chart(
-                plot_df,
-                title_text=f"{selected_questions[0]} – {selected_domain}",
-                y_axis_title=selected_questions[0],
-                color_enc=color_encoding,
-                dash_enc=stroke_dash_encoding
-                if chart_type == "Line Chart"
-                else alt.value([0, 0]),
-                x_off="Country:N" if chart_type == "Bar Chart" else alt.value(0),
-                show_ci_flag=(error_bar_type != "None"),
-                height=600,  # Increased height
+            # One indicator -> single chart (the landing view is pre-built by the warm-up)
+            warm_spec = (get_warm_artifact(data_key, "default_charts") or {}).get(
+                view_key(
+                    selected_domain, selected_questions, selected_countries, selected_sheets,
+                    selected_year_range, chart_type=chart_type, layout=layout, graph_style=graph_style,
+                    theme=theme, error_bar_type=error_bar_type, max_gap=max_gap, interpolate=interpolate,
+                )
             )
-            
+            if warm_spec is None:
+                chart = indicator_chart(
+                    plot_df,
+                    title_text=f"{selected_questions[0]} – {selected_domain}",
+                    graph_style=graph_style,
+                    chart_years=axis_years(selected_questions, wave_years, selected_year_range),
+                    countries=selected_countries,
+                    focal_country=focal_country,
+                    y_axis_title=selected_questions[0],
+                    height=600,  # Increased height
+                    **chart_kwargs,
+                )
+
             # Left aligned, narrower (approx 60% width)
             c_chart, _ = st.columns([3, 2])
             with c_chart:
+                if warm_spec is None:
+                    st.altair_chart(chart, width="stretch")
+                else:
+                    st.vega_lite_chart(warm_spec, width="stretch")
+    elif layout == MAP_LAYOUT and map_year is None:
+        st.warning("No survey wave in the selected year range. Widen the range to draw the map.")
+    elif layout == MAP_LAYOUT:
+        # Map -> grid of maps, one per indicator (only offered with boundaries)
+        levels = available_levels()
+        iso_by_country = match_countries(selected_countries, load_boundaries(levels[0]))
+        unmatched = sorted(set(selected_countries) - set(iso_by_country))
+        if unmatched:
+            st.warning("⚠️ No map boundaries for: " + ", ".join(unmatched))
+
+        map_df = plot_df[plot_df["Country"].isin(iso_by_country)]
+        if "interpolated" in map_df.columns:
+            map_df = map_df[~map_df["interpolated"]]
+        map_df = (
+            map_df[map_df["Year"] <= map_year]
+            .sort_values("Year", kind="stable")
+            .groupby(["Question", "Country"], observed=True)
+            .tail(1)
+            .assign(iso=lambda d: d["Country"].map(iso_by_country))
+        )
+
+        isos = tuple(sorted(set(iso_by_country.values())))
+        level = pick_level(load_boundaries(levels[0]), isos, levels)
+        topology = load_map_topology(level, isos)
+
+        cols = st.columns(grid_columns if len(selected_questions) > 1 else 1)
+        for i, q in enumerate(selected_questions):
+            chart = choropleth_chart(
+                topology,
+                map_df[map_df["Question"] == q],
+                title_text=f"{q} ({map_year})",
+                theme=theme,
+                height=600 if len(selected_questions) == 1 else 450,
+            )
+            with cols[i % len(cols)]:
                 st.altair_chart(chart, width="stretch")
     else:
         # Country panels -> grid of charts, one per country
-        if graph_style == "Black & white (line styles)":
-            panel_color = alt.value("black")
-            panel_dash = alt.StrokeDash("Question:N", title="Indicator")
-        else:
-            panel_color = alt.Color("Question:N", title="Indicator")
-            panel_dash = alt.value([1, 0])
-
         cols = st.columns(grid_columns)
         for i, country in enumerate(selected_countries):
             c_data = plot_df[plot_df["Country"] == country]
             if c_data.empty:
                 continue
-            chart = create_single_chart(
+            chart = country_panel_chart(
                 c_data,
                 title_text=f"{country}",
-                y_axis_title="Value",
-                color_enc=panel_color,
-                dash_enc=panel_dash
-                if chart_type == "Line Chart"
-                else alt.value([0, 0]),
-                x_off="Question:N" if chart_type == "Bar Chart" else alt.value(0),
-                show_ci_flag=(error_bar_type != "None"),
+                graph_style=graph_style,
+                chart_years=axis_years(selected_questions, wave_years, selected_year_range),
+                **chart_kwargs,
             )
             with cols[i % grid_columns]:
                 st.altair_chart(chart, width="stretch")
 
-    # --- 3. Footer / Export ---
+    # --- 3. Biggest Movers (all series in the dataset) ---
+    # Both rank the whole dataset: computed only once switched on
+    st.divider()
+    if st.toggle("🚀 Biggest Movers", key="show-movers", help="Rank every series by trend and jumps"):
+        movers = load_movers(data_key, long_df)
+        c_scope, c_rank, c_top = st.columns(3)
+        if c_scope.toggle("Current domain only", value=False):
+            movers = movers[movers["Domain"] == selected_domain]
+        rank_by = c_rank.radio("Rank by", ["Largest |z|", "Biggest jump", "Steepest trend"], horizontal=True)
+        top_n = c_top.number_input("Show top", min_value=5, max_value=500, value=25, step=5)
+
+        if rank_by == "Biggest jump":
+            movers = movers.sort_values("jump_z", key=np.abs, ascending=False, na_position="last")
+        elif rank_by == "Steepest trend":
+            movers = movers.sort_values("trend_z", key=np.abs, ascending=False, na_position="last")
+        movers = movers.head(int(top_n)).reset_index(drop=True)
+
+        st.caption(
+            "Trend: SE-weighted linear fit over the observed waves (change per decade). "
+            "Jump: largest change between consecutive waves, z = Δ / √(se₁² + se₂²); "
+            "|z| > 1.96 counts as significant. Click a row to open its chart."
+        )
+        st.dataframe(
+            movers.drop(columns="score"),
+            hide_index=True,
+            width="stretch",
+            column_config={
+                "waves": "Waves",
+                "first_year": st.column_config.NumberColumn("From", format="%d"),
+                "last_year": st.column_config.NumberColumn("To", format="%d"),
+                "slope": st.column_config.NumberColumn("Trend / decade", format="%.3f"),
+                "slope_se": st.column_config.NumberColumn("Trend SE", format="%.3f"),
+                "trend_z": st.column_config.NumberColumn("Trend z", format="%.1f"),
+                "from_year": st.column_config.NumberColumn("Jump from", format="%d"),
+                "to_year": st.column_config.NumberColumn("Jump to", format="%d"),
+                "change": st.column_config.NumberColumn("Jump", format="%.3f"),
+                "jump_z": st.column_config.NumberColumn("Jump z", format="%.1f"),
+                "sig_jumps": "Significant jumps",
+            },
+            key="movers-table",
+            on_select=partial(go_to_mover, movers),
+            selection_mode="single-row",
+        )
+
+    # --- 4. Indicator Correlations ---
+    if st.toggle("🔗 Indicator Correlations", key="show-correlations",
+                 help="Correlate every pair of indicators across Country-Years"):
+        c_scope, c_weight, c_min = st.columns(3)
+        scope = c_scope.radio(
+            "Indicators", ["Current domain", "Selected indicators", "All indicators"], horizontal=True
+        )
+        weighting = c_weight.selectbox("Weighting", list(CORRELATION_WEIGHTS))
+        min_periods = c_min.number_input(
+            "Min. Country-Years per pair", min_value=3, max_value=100, value=DEFAULT_CORRELATION["min_periods"]
+        )
+
+        corr, pairs = load_correlations(data_key, long_df, CORRELATION_WEIGHTS[weighting], int(min_periods))
+        if scope == "All indicators":
+            keep = list(corr.index)
+        else:
+            in_scope = set(dom_df["Question"].unique() if scope == "Current domain" else selected_questions)
+            keep = [q for q in corr.index if q in in_scope]
+        corr, pairs = corr.loc[keep, keep], pairs.loc[keep, keep]
+
+        if len(keep) < 2:
+            st.info("Correlations need at least two stored indicators in scope.")
+        else:
+            st.caption(
+                "Pearson r across Country-Years where both indicators are present"
+                + ("" if weighting == "None" else f", weighted by {weighting.lower()}")
+                + ". Blank cells have too few shared Country-Years."
+            )
+            if len(keep) <= HEATMAP_MAX_INDICATORS:
+                st.altair_chart(correlation_heatmap(corr, pairs, f"Correlations: {scope}", theme))
+            else:
+                st.caption(f"{len(keep)} indicators: too many for a readable heatmap, showing pairs only.")
+            st.dataframe(
+                strongest_pairs(corr, pairs, limit=25),
+                hide_index=True,
+                width="stretch",
+                column_config={"r": st.column_config.NumberColumn("r", format="%.2f")},
+            )
+
+    # --- 5. Footer / Export ---
     st.divider()
 
     # --- Selected Indicator Definitions ---
@@ -743,9 +1018,10 @@ with tab1:
 
         schema = get_schema_dict()
         item_descs = get_item_descriptions()
+        composite_info = {d["name"]: describe_composite(d) for d in composites.values()}
 
         for q in selected_questions:
-            info = schema.get(q)
+            info = schema.get(q) or composite_info.get(q)
             if info:
                 with st.expander(f"ℹ️ {q}", expanded=False):
                     items_used = info.get("Items Used", "N/A")
@@ -759,31 +1035,10 @@ with tab1:
                     )
 
                     # Try to find relevant item descriptions
-                    import re
-
-                    relevant_items = []
-                    for code, desc in item_descs.items():
-                        # 1) Exact substring match
-                        if code in items_used:
-                            relevant_items.append(f"- **{code}**: {desc}")
-                        else:
-                            # 2) Range parsing, e.g. A065–A074
-                            ranges = re.findall(
-                                r"([A-Z]\d+)[-–—]([A-Z]\d+)", items_used
-                            )
-                            for start, end in ranges:
-                                if start[0] == end[0] == code[0]:
-                                    try:
-                                        s_num = int(start[1:])
-                                        e_num = int(end[1:])
-                                        c_num = int(code[1:])
-                                        if s_num <= c_num <= e_num:
-                                            relevant_items.append(
-                                                f"- **{code}**: {desc}"
-                                            )
-                                            break
-                                    except Exception:
-                                        pass
+                    relevant_items = [
+                        f"- **{code}**: {desc}"
+                        for code, desc in related_items(items_used, item_descs).items()
+                    ]
 
                     if relevant_items:
                         st.markdown("**Constituent Items:**")
@@ -796,7 +1051,8 @@ with tab1:
         c1, c2 = st.columns([1, 3])
         with c1:
             st.markdown("### Download")
-            csv = plot_df.to_csv(index=False).encode("utf-8")
+            export_df = export_frame(plot_df, error_bar_type)
+            csv = export_df.to_csv(index=False).encode("utf-8")
             st.download_button(
                 "Download CSV",
                 csv,
@@ -808,7 +1064,7 @@ with tab1:
 
             buffer = io.BytesIO()
             with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                plot_df.to_excel(writer, sheet_name="Data", index=False)
+                export_df.to_excel(writer, sheet_name="Data", index=False)
 
             st.download_button(
                 "Download Excel",
@@ -819,6 +1075,46 @@ with tab1:
                 use_container_width=True,
             )
 
+            # Bulk package: all domains, with the current chart settings
+            st.markdown("### Report Package")
+            if st.button(
+                "Build report package",
+                help="One workbook per domain (a sheet per indicator + definitions) "
+                "and matching chart images, zipped",
+                width="stretch",
+            ):
+                schema, item_descs = get_definitions()
+                package = tempfile.TemporaryFile()
+                bar = st.progress(0.0, text="Building report package…")
+                try:
+                    summary = write_report_package(
+                        package,
+                        split_segments(load_series(data_key, long_df, interpolate, None, None)[0], max_gap),
+                        schema,
+                        item_descs,
+                        chart_type=chart_type,
+                        graph_style=graph_style,
+                        theme=theme,
+                        error_bar_type=error_bar_type,
+                        interpolate=interpolate,
+                        progress=lambda f, d: bar.progress(f, text=f"Packaging {d}…" if d else "Done"),
+                    )
+                except Exception as e:
+                    package.close()
+                    st.error(f"Error building report package: {e}")
+                else:
+                    package.seek(0)
+                    st.download_button(
+                        f"Download ZIP ({summary['domains']} domains, {summary['indicators']} indicators)",
+                        package.read(),
+                        "indicator_report.zip",
+                        "application/zip",
+                        key="download-report",
+                        width="stretch",
+                    )
+                    if summary["chart_format"] != "png":
+                        st.caption("Charts saved as Vega-Lite JSON (install vl-convert-python for PNG).")
+
         with c2:
             st.markdown("### Raw Data Preview")
             # Optional quick summary of SE / N
@@ -832,4 +1128,39 @@ with tab1:
                         f"- Median N: **{int(n_valid.median())}** "
                         f"(min: {int(n_valid.min())}, max: {int(n_valid.max())})"
                     )
-            st.dataframe(plot_df, height=200, use_container_width=True)
+
+            # Paged preview: only one page is sorted out of the cached index and sent
+            p1, p2, p3 = st.columns([2, 1, 2])
+            sort_col = p1.selectbox("Sort by", list(sort_index), key="preview-sort")
+            descending = p2.toggle("Descending", key="preview-desc")
+            row_filter = p3.text_input(
+                "Filter", key="preview-filter", placeholder="Country / indicator"
+            )
+
+            # plot_df keeps the row positions of series_df as its index
+            preview_df = plot_df
+            if row_filter:
+                hit = plot_df["Country"].str.contains(
+                    row_filter, case=False, regex=False
+                ) | plot_df["Question"].str.contains(row_filter, case=False, regex=False)
+                preview_df = plot_df[hit]
+
+            n_pages = max(1, -(-len(preview_df) // PREVIEW_PAGE_SIZE))
+            page = st.number_input("Page", 1, n_pages, 1)
+            page_df, total_rows = get_page(
+                preview_df,
+                sort_index[sort_col],
+                page - 1,
+                descending=descending,
+            )
+            st.dataframe(
+                export_frame(page_df, error_bar_type),
+                height=200,
+                width="stretch",
+                hide_index=True,
+            )
+            first_row = (page - 1) * PREVIEW_PAGE_SIZE
+            st.caption(
+                f"Rows {min(first_row + 1, total_rows)}–{first_row + len(page_df)} "
+                f"of {total_rows} (page {page} of {n_pages})"
+            )
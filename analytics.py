@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+from timeseries import SERIES_KEYS
+
+
+# -------------------------------------------------
+# Batch trend / change-point analytics over all series
+# -------------------------------------------------
+Z_95 = 1.96
+
+
+def _observed(series_df: pd.DataFrame) -> pd.DataFrame:
+    """Observed waves only, in series order, with a usable (positive) SE."""
+    obs = series_df
+    if "interpolated" in obs.columns:
+        obs = obs[~obs["interpolated"]]
+    if "se" not in obs.columns:
+        return obs.iloc[0:0]
+    return obs[obs["se"] > 0]
+
+
+def series_trends(series_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    SE-weighted (w = 1/se²) linear trend of every (Domain, Question, Country)
+    series with at least two waves, from grouped sums in one pass.
+
+    When a series has more than two waves, the slope SE is inflated by
+    sqrt(reduced chi²) if the waves scatter more than their SEs explain.
+
+    Returns one row per series with: waves, first_year, last_year,
+    slope (per decade), slope_se (per decade), trend_z.
+    """
+    obs = _observed(series_df)
+    x = obs["Year"].to_numpy(dtype=float)
+    x = x - (x.mean() if len(x) else 0.0)  # centring keeps the sums well conditioned
+    y = obs["value"].to_numpy(dtype=float)
+    w = 1.0 / obs["se"].to_numpy(dtype=float) ** 2
+
+    sums = pd.DataFrame(
+        {
+            "waves": 1,
+            "sw": w,
+            "swx": w * x,
+            "swy": w * y,
+            "swxx": w * x * x,
+            "swxy": w * x * y,
+            "swyy": w * y * y,
+        },
+        index=pd.MultiIndex.from_frame(obs[SERIES_KEYS]),
+    ).groupby(level=SERIES_KEYS, sort=False).sum()
+
+    years = obs.groupby(SERIES_KEYS, sort=False)["Year"].agg(["min", "max"])
+
+    det = sums["sw"] * sums["swxx"] - sums["swx"] ** 2
+    valid = (sums["waves"] >= 2) & (det > 0)
+    sums, det, years = sums[valid], det[valid], years[valid]
+
+    slope = (sums["sw"] * sums["swxy"] - sums["swx"] * sums["swy"]) / det
+    intercept = (sums["swy"] - slope * sums["swx"]) / sums["sw"]
+    slope_se = np.sqrt(sums["sw"] / det)
+
+    # Residual chi² = Σ w (y - a - b x)², expanded in terms of the sums
+    chi2 = (
+        sums["swyy"] - 2 * intercept * sums["swy"] - 2 * slope * sums["swxy"]
+        + intercept ** 2 * sums["sw"] + 2 * intercept * slope * sums["swx"]
+        + slope ** 2 * sums["swxx"]
+    ).clip(lower=0)
+    dof = sums["waves"] - 2
+    inflation = np.sqrt(np.maximum(1.0, chi2 / dof.where(dof > 0)).fillna(1.0))
+    slope_se = slope_se * inflation
+
+    out = pd.DataFrame(
+        {
+            "waves": sums["waves"],
+            "first_year": years["min"],
+            "last_year": years["max"],
+            "slope": slope * 10,
+            "slope_se": slope_se * 10,
+            "trend_z": slope / slope_se,
+        }
+    )
+    return out.reset_index()
+
+
+def series_jumps(series_df: pd.DataFrame, z_crit: float = Z_95) -> pd.DataFrame:
+    """
+    Wave-to-wave changes of every series: change = v1 - v0 and
+    z = change / sqrt(se0² + se1²), flagged significant when |z| > z_crit.
+    """
+    obs = _observed(series_df).sort_values(SERIES_KEYS + ["Year"], kind="stable")
+    same = np.ones(len(obs), dtype=bool)
+    for key in SERIES_KEYS:
+        k = obs[key].to_numpy()
+        same[1:] &= k[1:] == k[:-1]
+    same[0:1] = False
+
+    prev = obs.shift(1)
+    jumps = obs.loc[same, SERIES_KEYS + ["Year"]].rename(columns={"Year": "to_year"})
+    jumps.insert(len(SERIES_KEYS), "from_year", prev.loc[same, "Year"].astype(int))
+    jumps["change"] = obs.loc[same, "value"] - prev.loc[same, "value"]
+    jumps["jump_z"] = jumps["change"] / np.sqrt(obs.loc[same, "se"] ** 2 + prev.loc[same, "se"] ** 2)
+    jumps["significant"] = jumps["jump_z"].abs() > z_crit
+    return jumps.reset_index(drop=True)
+
+
+def biggest_movers(series_df: pd.DataFrame, z_crit: float = Z_95) -> pd.DataFrame:
+    """
+    One row per series: its trend plus its largest wave-to-wave jump and the
+    number of significant jumps, ranked by the larger of |trend z| and |jump z|.
+    """
+    trends = series_trends(series_df)
+    jumps = series_jumps(series_df, z_crit)
+
+    if jumps.empty:
+        top = pd.DataFrame(columns=SERIES_KEYS + ["from_year", "to_year", "change", "jump_z", "sig_jumps"])
+    else:
+        top_idx = jumps["jump_z"].abs().groupby([jumps[k] for k in SERIES_KEYS], sort=False).idxmax()
+        top = jumps.loc[top_idx, SERIES_KEYS + ["from_year", "to_year", "change", "jump_z"]]
+        sig = jumps.groupby(SERIES_KEYS, sort=False)["significant"].sum().rename("sig_jumps")
+        top = top.merge(sig.reset_index(), on=SERIES_KEYS)
+
+    movers = trends.merge(top, on=SERIES_KEYS, how="outer")
+    movers["score"] = np.fmax(movers["trend_z"].abs(), movers["jump_z"].abs())
+    return movers.sort_values("score", ascending=False, na_position="last").reset_index(drop=True)
+
+
+# -------------------------------------------------
+# Cross-indicator correlations
+# -------------------------------------------------
+CORRELATION_WEIGHTS = {
+    "None": None,
+    "Sample size (n)": "n",
+    "Inverse variance (1/se²)": "se",
+}
+
+
+def indicator_matrix(long_df: pd.DataFrame) -> dict:
+    """
+    Pivots the long frame into Country-Year x Question matrices (sheets
+    holding the same wave are averaged).
+
+    Returns:
+        {"value": DataFrame, "n": DataFrame or None, "se": DataFrame or None},
+        all with the same index and columns
+    """
+    keys = ["Country", "Year"]
+    value = long_df.pivot_table(index=keys, columns="Question", values="value", aggfunc="mean", observed=True)
+    out = {"value": value, "n": None, "se": None}
+    for col in ("n", "se"):
+        if col in long_df.columns:
+            out[col] = long_df.pivot_table(
+                index=keys, columns="Question", values=col, aggfunc="mean", observed=True
+            ).reindex(index=value.index, columns=value.columns)
+    return out
+
+
+def correlation_matrix(matrices: dict, weight: str = None, min_periods: int = 3) -> tuple:
+    """
+    All pairwise Pearson correlations between indicators over the
+    Country-Years where both are present, from a handful of matrix products.
+
+    With weighting, a Country-Year counts in a pair with the geometric mean
+    of its two cell weights (n, or 1/se²), which keeps every sum a product
+    of per-column factors.
+
+    Returns:
+        corr (DataFrame): Question x Question, NaN where fewer than min_periods pairs
+        pairs (DataFrame): number of Country-Years behind each correlation
+    """
+    value = matrices["value"]
+    x = value.to_numpy(dtype=float)
+    mask = ~np.isnan(x)
+    x = np.where(mask, x - np.nanmean(np.where(mask, x, np.nan), axis=0), 0.0)
+
+    if weight is None:
+        a = mask.astype(float)
+    else:
+        w = matrices[weight].to_numpy(dtype=float)
+        if weight == "se":
+            with np.errstate(divide="ignore"):
+                w = 1.0 / w ** 2
+        a = np.where(mask & np.isfinite(w) & (w > 0), np.sqrt(np.abs(w)), 0.0)
+
+    ax = a * x
+    sw = a.T @ a                    # Σ weights over co-observed rows
+    sx = ax.T @ a                   # [i, j]: Σ w x_i over rows where j is present
+    sxx = (ax * x).T @ a
+    sxy = ax.T @ ax
+    present = (a > 0).astype(float)
+    pairs = np.rint(present.T @ present).astype(np.int64)  # float product: BLAS, unlike ints
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sx / sw
+        var = sxx / sw - mean ** 2
+        cov = sxy / sw - mean * mean.T
+        corr = cov / np.sqrt(var * var.T)
+    corr[(pairs < min_periods) | ~(var > 1e-12) | ~(var.T > 1e-12)] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.diag(pairs) >= min_periods, 1.0, np.nan))
+
+    return (
+        pd.DataFrame(corr, index=value.columns, columns=value.columns),
+        pd.DataFrame(pairs, index=value.columns, columns=value.columns),
+    )
+
+
+def strongest_pairs(corr: pd.DataFrame, pairs: pd.DataFrame, limit: int = 20) -> pd.DataFrame:
+    """Indicator pairs ordered by |r| (each pair once)."""
+    i, j = np.triu_indices(len(corr), k=1)
+    r = corr.to_numpy()[i, j]
+    keep = ~np.isnan(r)
+    out = pd.DataFrame(
+        {
+            "Indicator A": corr.index[i[keep]],
+            "Indicator B": corr.columns[j[keep]],
+            "r": r[keep],
+            "Country-Years": pairs.to_numpy()[i[keep], j[keep]],
+        }
+    )
+    return out.reindex(out["r"].abs().sort_values(ascending=False).index).head(limit).reset_index(drop=True)
@@ -0,0 +1,437 @@
+import altair as alt
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# Chart building (Altair / Vega-Lite)
+# NOTE: Kept free of Streamlit calls so charts can also be built outside a
+# script run (bulk exports, warm-up).
+# -------------------------------------------------
+# st.altair_chart draws charts of any size, so specs serialised outside it
+# (warm-up, report package) must not stop at Altair's 5,000-row default either.
+# Set once here rather than toggled around each to_dict(): the transformer
+# registry is process-global, and Streamlit switches it under its own lock.
+alt.data_transformers.disable_max_rows()
+
+# Fields embedded in chart specs (plus the selected CI bounds)
+CHART_COLUMNS = ["Country", "Year", "Question", "value", "se", "n", "segment", "interpolated"]
+
+# Options offered in the sidebar's visual settings
+CHART_TYPES = ["Line Chart", "Bar Chart"]
+LAYOUTS = ["Single figure (all countries)", "Country panels"]
+# Only offered when country boundaries have been built (see geo_store.py)
+MAP_LAYOUT = "Map (choropleth)"
+GRAPH_STYLES = [
+    "Colorblind-safe (default)",
+    "Vibrant (Tableau 10)",
+    "Pastel (Soft)",
+    "Earth Tones (Muted)",
+    "Monochrome (blue shades)",
+    "Black & white (line styles)",
+    "Highlight focal country",
+]
+THEMES = [
+    "Academic (light)",
+    "OECD grey",
+    "Dark dashboard",
+    "Pastel report",
+    "The Economist",
+    "Financial Times",
+]
+
+
+# --- Style helpers ---
+def get_country_color_encoding(graph_style: str, focal_country=None):
+    """Color mapping for countries, depending on graph style."""
+    if graph_style == "Colorblind-safe (default)":
+        palette = [
+            "#1b9e77",
+            "#d95f02",
+            "#7570b3",
+            "#e7298a",
+            "#66a61e",
+            "#e6ab02",
+            "#a6761d",
+            "#666666",
+        ]
+        return alt.Color(
+            "Country:N",
+            title="Country",
+            scale=alt.Scale(range=palette),
+        )
+
+    if graph_style == "Vibrant (Tableau 10)":
+        # Tableau 10 standard
+        palette = [
+            "#4e79a7", "#f28e2b", "#e15759", "#76b7b2", "#59a14f",
+            "#edc948", "#b07aa1", "#ff9da7", "#9c755f", "#bab0ac"
+        ]
+        return alt.Color("Country:N", title="Country", scale=alt.Scale(range=palette))
+
+    if graph_style == "Pastel (Soft)":
+        # Brewer Pastel1 + Pastel2 mix
+        palette = [
+            "#fbb4ae", "#b3cde3", "#ccebc5", "#decbe4", "#fed9a6",
+            "#ffffcc", "#e5d8bd", "#fddaec", "#f2f2f2"
+        ]
+        return alt.Color("Country:N", title="Country", scale=alt.Scale(range=palette))
+
+    if graph_style == "Earth Tones (Muted)":
+        # Muted earth tones
+        palette = [
+            "#8c564b", "#c49c94", "#7f7f7f", "#c7c7c7", "#bcbd22",
+            "#dbdb8d", "#17becf", "#9edae5"
+        ]
+        return alt.Color("Country:N", title="Country", scale=alt.Scale(range=palette))
+
+    if graph_style == "Monochrome (blue shades)":
+        return alt.Color(
+            "Country:N",
+            title="Country",
+            scale=alt.Scale(scheme="blues"),
+        )
+
+    if graph_style == "Highlight focal country" and focal_country is not None:
+        return alt.condition(
+            alt.datum.Country == focal_country,
+            alt.value("#1f77b4"),  # highlight
+            alt.value("#CCCCCC"),  # others
+        )
+
+    return alt.value("black")
+
+
+def get_stroke_dash_encoding(graph_style: str, countries: list):
+    """Line style mapping (used for black & white)."""
+    if graph_style == "Black & white (line styles)":
+        return alt.StrokeDash(
+            "Country:N",
+            title="Country",
+            sort=countries,
+        )
+    return alt.value([1, 0])
+
+
+def style_chart(chart: alt.Chart, theme: str) -> alt.Chart:
+    """Apply theme preset: fonts, fill, grid, legend, etc."""
+    chart = (
+        chart.configure_axis(labelFontSize=13, titleFontSize=15)
+        .configure_legend(titleFontSize=14, labelFontSize=12)
+        .configure_title(fontSize=18, anchor="start")
+    )
+
+    if theme == "Academic (light)":
+        chart = chart.configure_view(strokeWidth=0, fill="white").configure_axis(
+            grid=True, gridColor="#DDDDDD"
+        )
+    elif theme == "OECD grey":
+        chart = chart.configure_view(
+            stroke="#CCCCCC", strokeWidth=1, fill="white"
+        ).configure_axis(grid=True, gridColor="#E0E0E0")
+    elif theme == "Dark dashboard":
+        chart = (
+            chart.configure_view(strokeWidth=0, fill="#111111")
+            .configure_axis(
+                labelColor="white",
+                titleColor="white",
+                grid=True,
+                gridColor="#333333",
+            )
+            .configure_legend(titleColor="white", labelColor="white")
+            .configure_title(color="white")
+        )
+    elif theme == "Pastel report":
+        chart = chart.configure_view(strokeWidth=0, fill="#FAFAFA").configure_axis(
+            grid=True, gridColor="#F0F0F0"
+        )
+    elif theme == "The Economist":
+        chart = chart.configure_view(strokeWidth=0, fill="#d5e4eb").configure_axis(
+            grid=True,
+            gridColor="white",
+            labelFont="Verdana",
+            titleFont="Verdana",
+        ).configure_title(font="Verdana", fontSize=20).configure_legend(
+            labelFont="Verdana", titleFont="Verdana"
+        )
+    elif theme == "Financial Times":
+        chart = chart.configure_view(strokeWidth=0, fill="#fff1e0").configure_axis(
+            grid=True,
+            gridColor="#e3cbb0",
+            labelFont="Georgia",
+            titleFont="Georgia",
+        ).configure_title(font="Georgia", fontSize=20).configure_legend(
+            labelFont="Georgia", titleFont="Georgia"
+        )
+
+    return chart
+
+
+def axis_years(questions, wave_years: dict, year_range: tuple) -> list:
+    """Axis ticks: the (precomputed) wave years of the charted questions within year_range."""
+    return sorted(
+        {
+            y
+            for q in questions
+            for y in wave_years.get(q, [])
+            if year_range[0] <= y <= year_range[1]
+        }
+    )
+
+
+# --- Plotting Logic ---
+def create_single_chart(
+    data: pd.DataFrame,
+    title_text: str,
+    chart_type: str = "Line Chart",
+    theme: str = "Academic (light)",
+    chart_years=None,
+    ci_cols=None,
+    interpolate: bool = False,
+    x_axis_title: str = "Year",
+    y_axis_title: str = "Value",
+    color_enc=None,
+    dash_enc=None,
+    x_off=None,
+    show_ci_flag: bool = True,
+    height: int = 450,
+) -> alt.Chart:
+    """
+    Builds one themed line / bar chart of 'value' over 'Year'.
+    chart_years are the x-axis ticks (see axis_years); ci_cols is the
+    (low, high) column pair of the selected error bar mode, or None.
+    """
+    if chart_years is None:
+        chart_years = sorted(data["Year"].dropna().unique().astype(int))
+
+    # Only the fields the spec uses are embedded (column selection, no data copy)
+    chart_cols = CHART_COLUMNS + (list(ci_cols) if ci_cols else [])
+    base = alt.Chart(data[[c for c in chart_cols if c in data.columns]])
+
+    tooltip = [
+        "Country",
+        "Year",
+        "Question",
+        alt.Tooltip("value:Q", title="Mean"),
+        alt.Tooltip("se:Q", title="SE", format=".3f"),
+        alt.Tooltip("n:Q", title="N"),
+    ]
+    if ci_cols:
+        tooltip += [
+            alt.Tooltip(f"{ci_cols[0]}:Q", title="CI low", format=".3f"),
+            alt.Tooltip(f"{ci_cols[1]}:Q", title="CI high", format=".3f"),
+        ]
+
+    # Main layer: bar or line
+    if chart_type == "Bar Chart":
+        main_mark = base.mark_bar()
+    else:
+        # Markers only on observed waves when interpolated points are present
+        main_mark = base.mark_line(point=not interpolate)
+
+    main = main_mark.encode(
+        x=alt.X("Year:Q", title=x_axis_title, axis=alt.Axis(format="04d", values=chart_years)),
+        y=alt.Y("value:Q", title=y_axis_title),
+        color=color_enc,
+        strokeDash=dash_enc,
+        xOffset=x_off,
+        tooltip=tooltip,
+        order="Year",
+    )
+    if chart_type == "Line Chart":
+        # Separate segments are never joined across long wave gaps
+        main = main.encode(detail="segment:N")
+
+    layers = [main]
+
+    if chart_type == "Line Chart" and interpolate:
+        observed = base.transform_filter("!datum.interpolated").mark_point(filled=True).encode(
+            x=alt.X("Year:Q"),
+            y=alt.Y("value:Q"),
+            color=color_enc,
+            xOffset=x_off,
+            tooltip=[
+                "Country",
+                "Year",
+                "Question",
+                alt.Tooltip("value:Q", title="Mean"),
+                alt.Tooltip("se:Q", title="SE", format=".3f"),
+                alt.Tooltip("n:Q", title="N"),
+            ],
+        )
+        layers.append(observed)
+
+    # Optional CI layer
+    if (
+        show_ci_flag
+        and ci_cols is not None
+        and data[ci_cols[0]].notna().any()
+    ):
+        if chart_type == "Bar Chart":
+            err = base.mark_errorbar().encode(
+                x=alt.X("Year:Q", title=x_axis_title, axis=alt.Axis(format="04d", values=chart_years)),
+                y=alt.Y(f"{ci_cols[0]}:Q", title=y_axis_title),
+                y2=f"{ci_cols[1]}:Q",
+                color=color_enc,
+                xOffset=x_off,
+            )
+        else:
+            err = base.mark_errorband(opacity=0.2).encode(
+                x=alt.X("Year:Q", title=x_axis_title, axis=alt.Axis(format="04d", values=chart_years)),
+                y=alt.Y(f"{ci_cols[0]}:Q", title=y_axis_title),
+                y2=f"{ci_cols[1]}:Q",
+                color=color_enc,
+                detail="segment:N",
+            )
+        layers.insert(0, err)
+
+    chart = alt.layer(*layers).properties(
+        title=title_text,
+        height=height,  # Dynamic height
+    )
+    return style_chart(chart, theme)
+
+
+def indicator_chart(
+    q_data: pd.DataFrame,
+    title_text: str,
+    chart_type: str,
+    graph_style: str,
+    theme: str,
+    chart_years=None,
+    ci_cols=None,
+    interpolate: bool = False,
+    countries=None,
+    focal_country=None,
+    y_axis_title: str = "Value",
+    height: int = 450,
+) -> alt.Chart:
+    """One indicator, all countries (the 'Single figure' layout)."""
+    if countries is None:
+        countries = sorted(q_data["Country"].unique())
+    return create_single_chart(
+        q_data,
+        title_text=title_text,
+        chart_type=chart_type,
+        theme=theme,
+        chart_years=chart_years,
+        ci_cols=ci_cols,
+        interpolate=interpolate,
+        y_axis_title=y_axis_title,
+        color_enc=get_country_color_encoding(graph_style, focal_country),
+        dash_enc=get_stroke_dash_encoding(graph_style, countries)
+        if chart_type == "Line Chart"
+        else alt.value([0, 0]),
+        x_off="Country:N" if chart_type == "Bar Chart" else alt.value(0),
+        show_ci_flag=ci_cols is not None,
+        height=height,
+    )
+
+
+def country_panel_chart(
+    c_data: pd.DataFrame,
+    title_text: str,
+    chart_type: str,
+    graph_style: str,
+    theme: str,
+    chart_years=None,
+    ci_cols=None,
+    interpolate: bool = False,
+    height: int = 450,
+) -> alt.Chart:
+    """One country, all selected indicators (the 'Country panels' layout)."""
+    if graph_style == "Black & white (line styles)":
+        color_enc = alt.value("black")
+        dash_enc = alt.StrokeDash("Question:N", title="Indicator")
+    else:
+        color_enc = alt.Color("Question:N", title="Indicator")
+        dash_enc = alt.value([1, 0])
+
+    return create_single_chart(
+        c_data,
+        title_text=title_text,
+        chart_type=chart_type,
+        theme=theme,
+        chart_years=chart_years,
+        ci_cols=ci_cols,
+        interpolate=interpolate,
+        y_axis_title="Value",
+        color_enc=color_enc,
+        dash_enc=dash_enc if chart_type == "Line Chart" else alt.value([0, 0]),
+        x_off="Question:N" if chart_type == "Bar Chart" else alt.value(0),
+        show_ci_flag=ci_cols is not None,
+        height=height,
+    )
+
+
+def choropleth_chart(
+    topology: dict,
+    map_data: pd.DataFrame,
+    title_text: str,
+    theme: str,
+    feature: str = "countries",
+    height: int = 450,
+) -> alt.Chart:
+    """
+    Map of one indicator in one year: countries of an (already subset)
+    TopoJSON topology filled by value. map_data holds one row per country
+    with an 'iso' column matching the geometries' ids (and the wave 'Year'
+    shown, which may differ between countries).
+    """
+    fields = ["Country", "Year", "value", "se", "n"]
+    values = map_data[["iso"] + fields].to_dict(orient="records")
+    chart = (
+        alt.Chart(alt.InlineData(values=topology, format=alt.DataFormat(type="topojson", feature=feature)))
+        .mark_geoshape(stroke="white", strokeWidth=0.5)
+        .transform_lookup(
+            lookup="id",
+            from_=alt.LookupData(alt.InlineData(values=values), "iso", fields),
+        )
+        .encode(
+            color=alt.Color("value:Q", title="Value", scale=alt.Scale(scheme="viridis")),
+            tooltip=[
+                alt.Tooltip("Country:N"),
+                alt.Tooltip("Year:O", title="Wave"),
+                alt.Tooltip("value:Q", title="Value", format=".3f"),
+                alt.Tooltip("se:Q", title="SE", format=".3f"),
+                alt.Tooltip("n:Q", title="n"),
+            ],
+        )
+        .project(type="equalEarth")
+        .properties(title=title_text, height=height)
+    )
+    return style_chart(chart, theme)
+
+
+def correlation_heatmap(corr: pd.DataFrame, pairs: pd.DataFrame, title_text: str, theme: str) -> alt.Chart:
+    """Indicator x indicator heatmap of correlations (diverging, -1..1), labelled when small."""
+    order = list(corr.index)
+    cells = pd.DataFrame(
+        {
+            "A": np.repeat(order, len(order)),
+            "B": np.tile(order, len(order)),
+            "r": corr.to_numpy().ravel(),
+            "pairs": pairs.to_numpy().ravel(),
+        }
+    )
+    size = max(300, 22 * len(order))
+
+    base = alt.Chart(cells).encode(
+        x=alt.X("B:N", sort=order, title=None, axis=alt.Axis(labelAngle=-45, labelLimit=180)),
+        y=alt.Y("A:N", sort=order, title=None, axis=alt.Axis(labelLimit=220)),
+    )
+    chart = base.mark_rect().encode(
+        color=alt.Color("r:Q", title="r", scale=alt.Scale(scheme="redblue", domain=[-1, 1], reverse=True)),
+        tooltip=[
+            alt.Tooltip("A:N", title="Indicator A"),
+            alt.Tooltip("B:N", title="Indicator B"),
+            alt.Tooltip("r:Q", format=".2f"),
+            alt.Tooltip("pairs:Q", title="Country-Years"),
+        ],
+    )
+    if len(order) <= 20:
+        chart += base.mark_text(fontSize=10).encode(
+            text=alt.Text("r:Q", format=".2f"),
+            color=alt.condition("abs(datum.r) > 0.6", alt.value("white"), alt.value("black")),
+        )
+    return style_chart(chart.properties(title=title_text, width=size, height=size), theme)
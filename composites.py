@@ -0,0 +1,108 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# Composite indices: weighted combinations of stored indicators
+# -------------------------------------------------
+COMPOSITE_DOMAIN = "Custom composites"
+COMPOSITE_SHEET = "Composite"
+
+
+def make_definition(name: str, weights: dict, standardize: bool = False, normalize: bool = True) -> dict:
+    """
+    A composite definition.
+
+    Args:
+        name: label shown as the composite's Question.
+        weights: {Question: weight}; negative weights reverse a component.
+        standardize: z-score each component over the whole dataset first, so
+            indicators on different scales (means, counts, factor scores) mix.
+        normalize: divide by the sum of |weights| (a weighted mean) instead of
+            returning the plain weighted sum.
+
+    Raises ValueError if every weight is zero.
+    """
+    if not any(float(w) != 0 for w in weights.values()):
+        raise ValueError("At least one component needs a non-zero weight.")
+    return {
+        "name": name.strip(),
+        "weights": {q: float(w) for q, w in sorted(weights.items())},
+        "standardize": bool(standardize),
+        "normalize": bool(normalize),
+    }
+
+
+def definition_key(definition: dict) -> str:
+    """Canonical JSON of a definition; equal definitions give equal keys."""
+    return json.dumps(definition, sort_keys=True, separators=(",", ":"))
+
+
+def definition_hash(definition: dict) -> str:
+    return hashlib.sha1(definition_key(definition).encode("utf-8")).hexdigest()[:12]
+
+
+def describe_composite(definition: dict) -> dict:
+    """Schema-style entry (as in load_definitions) for the definitions panel."""
+    terms = " + ".join(f"{w:g}×{q}" for q, w in definition["weights"].items())
+    method = "Weighted mean" if definition["normalize"] else "Weighted sum"
+    if definition["standardize"]:
+        method += " of z-scores"
+    return {
+        "Domain": COMPOSITE_DOMAIN,
+        "Items Used": ", ".join(definition["weights"]),
+        "Method": f"{method}: {terms}",
+        "Interpretation": "Custom composite index (SE assumes independent components)",
+    }
+
+
+def evaluate_composite(long_df: pd.DataFrame, definition: dict) -> pd.DataFrame:
+    """
+    Evaluates a composite for every (Country, Year) where all components exist,
+    in one vectorized pass over the whole dataset.
+
+    value = Σ w_q x_q / s and se = sqrt(Σ w_q² se_q²) / s, with s = Σ|w_q| when
+    normalizing (else 1); components are treated as independent, so the SE
+    is approximate. n is the smallest component sample size.
+
+    Returns rows in the long layout (Domain, Question, Country, Year, value, se, n, Sheet).
+    Raises ValueError if a component to standardize has no variation.
+    """
+    weights = pd.Series(definition["weights"], dtype=float)
+    parts = long_df[long_df["Question"].isin(weights.index)]
+    keys = ["Country", "Year"]
+
+    # Country-Year x Question matrices (sheets holding the same wave are averaged)
+    value = parts.pivot_table(index=keys, columns="Question", values="value", aggfunc="mean")
+    value = value.reindex(columns=weights.index)
+    if "se" in parts.columns:
+        se = parts.pivot_table(index=keys, columns="Question", values="se", aggfunc="mean")
+        se = se.reindex(index=value.index, columns=weights.index)
+    else:
+        se = pd.DataFrame(np.nan, index=value.index, columns=weights.index)
+
+    if definition["standardize"]:
+        sd = value.std()
+        flat = sd.index[~(sd > 0)]
+        if len(flat):
+            raise ValueError(f"Cannot standardize {', '.join(flat)}: no variation across the dataset.")
+        value = (value - value.mean()) / sd
+        se = se / sd
+
+    complete = value.notna().all(axis=1).to_numpy()
+    w = weights.to_numpy()
+    scale = np.abs(w).sum() if definition["normalize"] else 1.0
+
+    out = value.index[complete].to_frame(index=False)
+    out.insert(0, "Question", definition["name"])
+    out.insert(0, "Domain", COMPOSITE_DOMAIN)
+    out["value"] = value.to_numpy()[complete] @ w / scale
+    out["se"] = np.sqrt((se.to_numpy()[complete] ** 2) @ (w ** 2)) / scale
+    if "n" in parts.columns:
+        n = parts.pivot_table(index=keys, columns="Question", values="n", aggfunc="min")
+        out["n"] = n.reindex(index=value.index[complete], columns=weights.index).min(axis=1).to_numpy()
+    out["Sheet"] = COMPOSITE_SHEET
+    return out
@@ -0,0 +1,399 @@
+import io
+import os
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+from queue import Empty
+
+import pandas as pd
+
+
+# -------------------------------------------------
+# Workbook ingestion (ResultswithSE.xlsx style)
+# NOTE: Kept free of Streamlit calls so that worker processes can import it
+# without executing the dashboard script.
+# -------------------------------------------------
+HEADER_SCAN_ROWS = 20
+
+# Progress stages reported for each sheet, in order
+LOAD_STAGES = ["reading", "header detection", "reshape", "typing"]
+
+# How often a parallel load checks its workers (and a cancel request)
+POLL_SECONDS = 0.1
+
+
+class LoadCancelled(Exception):
+    """Raised (typically from a progress callback) to abort a workbook load."""
+
+
+def find_header_row(df: pd.DataFrame) -> int:
+    """
+    Returns the index of the stats header row ('DOMAIN' | 'Question' | 'Mean' ...),
+    or -1 if none is found in the first HEADER_SCAN_ROWS rows.
+    """
+    # Search for the header row containing "DOMAIN" in the first column
+    for i in range(min(HEADER_SCAN_ROWS, len(df))):
+        val = str(df.iloc[i, 0]).strip().upper()
+        if val == "DOMAIN":
+            return i
+
+    # Fallback for flexibility: try to find "Standard Error" or "Count" in any row
+    for i in range(min(HEADER_SCAN_ROWS, len(df))):
+        row_vals = [str(x).lower() for x in df.iloc[i]]
+        if any("standard error" in x for x in row_vals) or any("count" in x for x in row_vals):
+            return i
+
+    return -1
+
+
+def normalize_stat(label):
+    """Normalise stat labels → mean / se / n."""
+    if isinstance(label, str):
+        l = label.lower()
+        if "standard error" in l:
+            return "se"
+        if "count" in l:
+            return "n"
+        if "mean" in l:
+            return "mean"
+    return "value"
+
+
+def parse_results_sheet(df: pd.DataFrame, progress=None, on_domains=None) -> pd.DataFrame:
+    """
+    Reshapes one raw sheet (read with header=None), where:
+    - col 0: Domain
+    - col 1: Question
+    - cols 2+: numeric triplets with 3 header rows:
+        row 1: Country
+        row 2: Year
+        row 3: 'Mean' / 'Standard Error of Mean' / 'Count'
+
+    Returns one row per (Domain, Question, Country, Year) with:
+        value = mean, se = standard error, n = sample size
+
+    progress, if given, is called with each stage name from LOAD_STAGES
+    as parsing reaches it; on_domains, if given, with the sorted domains
+    of the data rows right after header detection.
+
+    Raises ValueError if the header rows cannot be detected.
+    """
+    if progress is None:
+        progress = lambda stage: None
+
+    progress("header detection")
+    header_idx = find_header_row(df)
+    if header_idx < 2:
+        raise ValueError("Could not detect header rows (Country/Year/Stats) correctly.")
+
+    if on_domains is not None:
+        found = df.iloc[header_idx + 1:, 0].dropna().astype(str).str.strip()
+        on_domains(sorted(found[found != ""].unique()))
+
+    # Define offsets relative to the main header row
+    # Row [header_idx]: DOMAIN | Question | ... Stats ...
+    # Row [header_idx - 1]: Years
+    # Row [header_idx - 2]: Countries
+    stat_row = df.iloc[header_idx, 2:]
+    year_row = df.iloc[header_idx - 1, 2:]
+    country_row = df.iloc[header_idx - 2, 2:]
+
+    # Data starts immediately after the header row
+    data = df.iloc[header_idx + 1:].reset_index(drop=True)
+    data = data.rename(columns={0: "Domain", 1: "Question"})
+
+    progress("reshape")
+
+    # Melt numeric columns
+    value_cols = data.columns[2:]
+    long = data.melt(
+        id_vars=["Domain", "Question"],
+        value_vars=value_cols,
+        var_name="col_idx",
+        value_name="raw_value",
+    )
+
+    # Map each column index to (Country, Year, stat label) in one lookup
+    col_idx = long["col_idx"]
+    long["Country"] = country_row.reindex(col_idx).to_numpy()
+    long["Year"] = year_row.reindex(col_idx).to_numpy()
+    long["stat"] = stat_row.map(normalize_stat).reindex(col_idx).to_numpy()
+
+    progress("typing")
+
+    # Clean labels
+    long["Domain"] = long["Domain"].astype(str).str.strip()
+    long["Question"] = long["Question"].astype(str).str.strip()
+
+    # Convert value to numeric, coercing errors (like strings) to NaN
+    long["raw_value"] = pd.to_numeric(long["raw_value"], errors="coerce")
+
+    # Drop rows with no data
+    long = long.dropna(subset=["raw_value"])
+
+    # Pivot stats to columns
+    wide = (
+        long.pivot_table(
+            index=["Domain", "Question", "Country", "Year"],
+            columns="stat",
+            values="raw_value",
+            aggfunc="first",
+        )
+        .reset_index()
+    )
+
+    # Flatten column index
+    wide.columns = [str(c) for c in wide.columns]
+
+    # Rename mean column to value
+    if "mean" in wide.columns:
+        wide = wide.rename(columns={"mean": "value"})
+
+    # Drop rows where value is missing (crucial for line charts)
+    if "value" in wide.columns:
+        wide = wide.dropna(subset=["value"])
+
+    # Ensure Year is numeric
+    wide["Year"] = wide["Year"].astype(int)
+
+    return wide
+
+
+def read_definitions(filename) -> tuple:
+    """
+    Parses 'Indicator_Definitions.xlsx'.
+    Returns:
+        schema (dict): {Variable: {col: val, ...}}
+        item_descs (dict): {Code: Description}
+    """
+    # Load Schema
+    df_schema = pd.read_excel(filename, sheet_name="Schema")
+    df_schema["Variable"] = df_schema["Variable"].astype(str).str.strip()
+
+    # Convert to dict keyed by Variable
+    # orient='index' gives {index: {col: val}}, so we set index first
+    schema = df_schema.set_index("Variable").to_dict(orient="index")
+
+    # Load Items
+    df_items = pd.read_excel(filename, sheet_name="Items")
+    df_items["Code"] = df_items["Code"].astype(str).str.strip()
+    df_items["Description"] = df_items["Description"].astype(str).str.strip()
+
+    # Convert to dict {Code: Description}
+    item_descs = dict(zip(df_items["Code"], df_items["Description"]))
+
+    return schema, item_descs
+
+
+def _as_excel_source(source):
+    """Wraps raw bytes so pandas can read them; paths pass through unchanged."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def list_compatible_sheets(source) -> list:
+    """
+    Returns the names of all sheets whose first rows contain the
+    Country / Year / Stats header block.
+    """
+    with pd.ExcelFile(_as_excel_source(source)) as xls:
+        compatible = []
+        for sheet in xls.sheet_names:
+            head = pd.read_excel(xls, sheet_name=sheet, header=None, nrows=HEADER_SCAN_ROWS)
+            if not head.empty and find_header_row(head) >= 2:
+                compatible.append(sheet)
+    return compatible
+
+
+def read_sheet(source, sheet: str, progress=None, on_domains=None) -> tuple:
+    """
+    Reads and reshapes a single sheet.
+    Returns (sheet, long frame, parse seconds). Runs inside worker processes.
+    """
+    start = time.perf_counter()
+    if progress is not None:
+        progress("reading")
+    df = pd.read_excel(_as_excel_source(source), sheet_name=sheet, header=None)
+    wide = parse_results_sheet(df, progress, on_domains)
+    wide["Sheet"] = sheet
+    return sheet, wide, time.perf_counter() - start
+
+
+# Worker processes report stages and domains to the parent through this
+# queue (set by the pool initializer: a queue cannot be passed per task)
+_worker_queue = None
+
+
+def _init_worker(queue):
+    global _worker_queue
+    _worker_queue = queue
+
+
+def _read_sheet_in_worker(source, sheet: str) -> tuple:
+    return read_sheet(
+        source,
+        sheet,
+        progress=lambda stage: _worker_queue.put((sheet, "stage", stage)),
+        on_domains=lambda found: _worker_queue.put((sheet, "domains", found)),
+    )
+
+
+def load_workbook(source, sheets=None, max_workers=None, progress=None, on_domains=None) -> tuple:
+    """
+    Parses all compatible sheets of a workbook, one process per sheet.
+
+    Args:
+        source: path to the workbook or its raw bytes.
+        sheets: sheet names to load; defaults to every compatible sheet.
+        max_workers: process count; defaults to min(#sheets, #cores).
+        progress: optional callable(stage, fraction) with a stage from LOAD_STAGES
+            and the overall fraction done; it may raise LoadCancelled to abort.
+            With worker processes it is also called every POLL_SECONDS, and
+            raising terminates the workers still parsing.
+        on_domains: optional callable(domains) receiving the sorted domains
+            found so far, as soon as a sheet's header rows are detected.
+
+    Returns:
+        long_df (DataFrame): concatenated rows with a 'Sheet' column.
+        stats (DataFrame): one row per sheet with 'Sheet', 'Rows', 'Seconds'.
+    """
+    if progress is None:
+        progress = lambda stage, fraction: None
+
+    progress("reading", 0.0)
+    if sheets is None:
+        sheets = list_compatible_sheets(source)
+    if not sheets:
+        raise ValueError("No sheet with Country/Year/Stats header rows was found.")
+
+    if max_workers is None:
+        max_workers = min(len(sheets), os.cpu_count() or 1)
+
+    domains = set()
+
+    def found_domains(found):
+        if on_domains is not None and not domains.issuperset(found):
+            domains.update(found)
+            on_domains(sorted(domains))
+
+    results = []
+    if max_workers <= 1 or len(sheets) == 1:
+        for i, sheet in enumerate(sheets):
+            def stage_progress(stage, i=i):
+                progress(stage, (i + LOAD_STAGES.index(stage) / len(LOAD_STAGES)) / len(sheets))
+
+            results.append(read_sheet(source, sheet, stage_progress, found_domains))
+            progress("typing", (i + 1) / len(sheets))
+    else:
+        # Workers get a path, not the upload's bytes: a task's arguments are
+        # pickled per sheet, so bytes would be copied once for every sheet
+        tmp_path = None
+        if isinstance(source, (bytes, bytearray)):
+            fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
+            with os.fdopen(fd, "wb") as f:
+                f.write(source)
+            source = tmp_path
+
+        # 'spawn' keeps workers independent of the (threaded) server process
+        ctx = get_context("spawn")
+        queue = ctx.Queue()
+        pool = ctx.Pool(max_workers, initializer=_init_worker, initargs=(queue,))
+        try:
+            pending = {sheet: pool.apply_async(_read_sheet_in_worker, (source, sheet)) for sheet in sheets}
+            sheet_fraction = dict.fromkeys(sheets, 0.0)
+            stage, done = "reading", {}
+            while pending:
+                try:
+                    message = queue.get(timeout=POLL_SECONDS)
+                    while True:
+                        sheet, kind, payload = message
+                        if kind == "stage":
+                            stage = payload
+                            sheet_fraction[sheet] = LOAD_STAGES.index(payload) / len(LOAD_STAGES)
+                        else:
+                            found_domains(payload)
+                        message = queue.get_nowait()
+                except Empty:
+                    pass
+                for sheet in [s for s, r in pending.items() if r.ready()]:
+                    # get() re-raises a worker's exception here
+                    done[sheet] = pending.pop(sheet).get()
+                    sheet_fraction[sheet] = 1.0
+                progress(stage, sum(sheet_fraction.values()) / len(sheets))
+            results = [done[sheet] for sheet in sheets]
+            pool.close()
+        finally:
+            # On cancellation or error, stop the workers still parsing
+            pool.terminate()
+            pool.join()
+            queue.close()
+            if tmp_path is not None:
+                os.remove(tmp_path)
+
+    frames = [wide for _, wide, _ in results]
+    stats = pd.DataFrame(
+        [(sheet, len(wide), secs) for sheet, wide, secs in results],
+        columns=["Sheet", "Rows", "Seconds"],
+    )
+
+    long_df = pd.concat(frames, ignore_index=True)
+
+    # Sort by Year to ensure line order
+    long_df = long_df.sort_values(by=["Country", "Year"])
+
+    return long_df, stats
+
+
+class LoadJob:
+    """
+    Runs load_fn(job) in a daemon thread so the page stays responsive.
+    load_fn should pass job.report / job.set_domains to load_workbook.
+
+    Attributes:
+        stage, fraction: last reported progress
+        domains: domains found so far
+        result: load_fn's return value once finished
+        error: exception raised by load_fn, if any
+        cancelled: True once a cancel request has stopped the load
+    """
+
+    def __init__(self, load_fn):
+        self.stage = "queued"
+        self.fraction = 0.0
+        self.domains = []
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(load_fn,), daemon=True)
+        self._thread.start()
+
+    def _run(self, load_fn):
+        try:
+            self.result = load_fn(self)
+        except LoadCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+
+    def report(self, stage: str, fraction: float):
+        """Progress callback; aborts the load once cancel() was requested."""
+        if self._cancel.is_set():
+            raise LoadCancelled()
+        self.stage, self.fraction = stage, fraction
+
+    def set_domains(self, domains: list):
+        self.domains = domains
+
+    def cancel(self):
+        """
+        Stops parsing: in-process parsing at the next stage boundary; worker
+        processes are terminated within POLL_SECONDS.
+        """
+        self._cancel.set()
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# Paged, server-side sorted view over the indexed dataset
+# -------------------------------------------------
+PREVIEW_PAGE_SIZE = 50
+PREVIEW_SORT_COLUMNS = ["Country", "Year", "Question", "value", "se", "n", "Sheet"]
+
+
+def build_sort_index(df: pd.DataFrame, columns) -> dict:
+    """
+    Precomputes each sortable column's rank in a stable ascending sort.
+    Returns {column: ranks}, ranks[i] being the sort position of row i of df.
+    """
+    index = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        order = np.argsort(df[col].to_numpy(), kind="stable")
+        ranks = np.empty(len(order), dtype=np.int32 if len(order) < 2**31 else np.int64)
+        ranks[order] = np.arange(len(order))
+        index[col] = ranks
+    return index
+
+
+def get_page(
+    df: pd.DataFrame,
+    ranks: np.ndarray,
+    page: int,
+    page_size: int = PREVIEW_PAGE_SIZE,
+    descending: bool = False,
+) -> tuple:
+    """
+    Returns one page of df's rows in sort order. The work grows with the
+    selection only, never with the dataset: the selection is partitioned
+    around the page and just the page's rows are sorted.
+
+    Args:
+        df: the selected rows, indexed by row position in the dataset the
+            ranks were built on.
+        ranks: precomputed ranks from build_sort_index.
+        page: zero-based page number.
+
+    Returns:
+        page_df (DataFrame): at most page_size rows
+        total (int): number of selected rows
+    """
+    r = ranks[df.index.to_numpy()]
+    if descending:
+        r = -r
+    total = len(r)
+    start = min(page * page_size, total)
+    stop = min(start + page_size, total)
+    if start == stop:
+        return df.iloc[:0], total
+    rows = np.argpartition(r, [start, stop - 1])[start:stop]
+    return df.iloc[rows[np.argsort(r[rows])]], total
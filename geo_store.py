@@ -0,0 +1,322 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+
+# -------------------------------------------------
+# Offline country boundaries: pre-simplified TopoJSON per zoom level
+# -------------------------------------------------
+# The app only reads the files in BOUNDARY_DIR (no network access). They are
+# built once from any country-level GeoJSON, e.g. Natural Earth admin-0:
+#   python geo_store.py ne_50m_admin_0_countries.geojson
+# which writes boundaries/countries-<level>.topo.json for every level below.
+# The bundled files come from Natural Earth 1:110m admin-0 (public domain).
+# The dashboard offers its map layout only once these files exist.
+BOUNDARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "boundaries")
+OBJECT_NAME = "countries"
+QUANTIZATION = 100_000
+
+# (level, Douglas-Peucker tolerance in degrees, smallest map extent in degrees
+# the level is used for), coarsest first
+LEVELS = [
+    ("world", 0.1, 60.0),
+    ("region", 0.025, 15.0),
+    ("country", 0.005, 0.0),
+]
+
+NAME_FIELDS = ("NAME", "NAME_EN", "ADMIN", "NAME_LONG", "name")
+ISO_FIELDS = ("ISO_A3", "ADM0_A3", "iso_a3", "id")
+
+# Dataset labels that differ from the boundary names (matched case-insensitively)
+COUNTRY_ALIASES = {
+    "crotia": "HRV",
+    "czech republic": "CZE",
+    "great britain": "GBR",
+    "macedonia": "MKD",
+    "north macedonia": "MKD",
+    "bosnia herzegovina": "BIH",
+    "bosnia and herzegovina": "BIH",
+    "russian federation": "RUS",
+    "slovak republic": "SVK",
+    "moldova": "MDA",
+    "kosovo": "KOS",
+}
+
+
+def level_path(level: str, boundary_dir: str = BOUNDARY_DIR) -> str:
+    return os.path.join(boundary_dir, f"countries-{level}.topo.json")
+
+
+def available_levels(boundary_dir: str = BOUNDARY_DIR) -> list:
+    """Levels (coarsest first) whose TopoJSON file exists."""
+    return [name for name, _, _ in LEVELS if os.path.exists(level_path(name, boundary_dir))]
+
+
+def load_topology(level: str, boundary_dir: str = BOUNDARY_DIR) -> dict:
+    with open(level_path(level, boundary_dir), encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Runtime helpers ---
+def match_countries(labels, topology: dict) -> dict:
+    """
+    {dataset Country label: ISO3 code} for the labels found in the topology,
+    by boundary name, ISO3 code or COUNTRY_ALIASES (whitespace and case ignored).
+    """
+    index = {}
+    for geom in topology["objects"][OBJECT_NAME]["geometries"]:
+        props = geom["properties"]
+        index[props["name"].casefold()] = props["iso"]
+        index[props["iso"].casefold()] = props["iso"]
+    known = set(index.values())
+
+    matched = {}
+    for label in labels:
+        key = str(label).strip().casefold()
+        iso = index.get(key) or COUNTRY_ALIASES.get(key)
+        if iso in known:
+            matched[label] = iso
+    return matched
+
+
+def pick_level(topology: dict, isos, levels: list) -> str:
+    """
+    Finest useful level for a map of the given countries: the coarsest level
+    whose minimum extent fits the countries' combined bounding box.
+    """
+    boxes = [
+        g["properties"]["bbox"]
+        for g in topology["objects"][OBJECT_NAME]["geometries"]
+        if g["properties"]["iso"] in set(isos)
+    ]
+    if not boxes:
+        return levels[0]
+    b = np.array(boxes)
+    extent = max(b[:, 2].max() - b[:, 0].min(), b[:, 3].max() - b[:, 1].min())
+    for name, _, min_extent in LEVELS:
+        if name in levels and extent >= min_extent:
+            return name
+    return levels[-1]
+
+
+def subset_topology(topology: dict, isos) -> dict:
+    """Copy of the topology holding only the given countries and the arcs they use."""
+    wanted = set(isos)
+    geometries = [
+        g for g in topology["objects"][OBJECT_NAME]["geometries"] if g["properties"]["iso"] in wanted
+    ]
+    remap = {}
+
+    def ref(i):
+        j = remap.setdefault(i if i >= 0 else ~i, len(remap))
+        return j if i >= 0 else ~j
+
+    def walk(arcs):
+        return [walk(a) for a in arcs] if isinstance(arcs[0], list) else [ref(i) for i in arcs]
+
+    geometries = [dict(g, arcs=walk(g["arcs"])) for g in geometries]
+    return {
+        "type": "Topology",
+        "transform": topology["transform"],
+        "objects": {OBJECT_NAME: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": [topology["arcs"][i] for i in remap],
+    }
+
+
+# --- Building (offline) ---
+def _douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplifies a polyline, always keeping both end points."""
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, seg = points[i], points[i + 1:j] - points[i]
+        d = points[j] - a
+        norm = np.hypot(d[0], d[1])
+        if norm == 0:
+            dist = np.hypot(seg[:, 0], seg[:, 1])
+        else:
+            dist = np.abs(d[0] * seg[:, 1] - d[1] * seg[:, 0]) / norm
+        k = int(dist.argmax())
+        if dist[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack += [(i, m), (m, j)]
+    return points[keep]
+
+
+def _simplify_arc(points: np.ndarray, tolerance: float) -> np.ndarray:
+    simplified = _douglas_peucker(points, tolerance)
+    closed = len(points) >= 4 and (points[0] == points[-1]).all()
+    if closed and len(simplified) < 4:
+        # Keep a closed arc (island, enclave) a valid ring
+        simplified = points[[0, len(points) // 3, 2 * len(points) // 3, -1]]
+    return simplified
+
+
+def _read_features(geojson_path: str) -> list:
+    """[(iso, name, [polygon: [ring: (N, 2) array]])] from a GeoJSON FeatureCollection."""
+    with open(geojson_path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    features = []
+    for feature in collection["features"]:
+        props = feature.get("properties") or {}
+        geom = feature.get("geometry")
+        if not geom:
+            continue
+        name = next((props[k] for k in NAME_FIELDS if props.get(k)), None)
+        iso = next(
+            (str(props[k]) for k in ISO_FIELDS if props.get(k) and str(props[k]) != "-99"),
+            feature.get("id"),
+        )
+        if not name or not iso:
+            continue
+        polygons = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        features.append(
+            (str(iso), str(name), [[np.asarray(r, dtype=float)[:, :2] for r in p] for p in polygons])
+        )
+    return features
+
+
+def _canonical_ring(ring: list) -> tuple:
+    """Closed arc rotated to start at its smallest point, so shared rings compare equal."""
+    body = ring[:-1]
+    k = body.index(min(body))
+    body = body[k:] + body[:k]
+    return tuple(body + [body[0]])
+
+
+def build_topology(geojson_path: str) -> tuple:
+    """
+    Quantizes the features, cuts rings into arcs at junctions (points whose
+    neighbours differ between rings) and stores each shared border once.
+
+    Returns:
+        geometries (list): TopoJSON geometries with 'name', 'iso' and 'bbox' properties
+        arcs (list): arcs as (N, 2) integer arrays, not yet simplified
+        transform (dict): TopoJSON quantization transform
+    """
+    features = _read_features(geojson_path)
+    coords = np.vstack([r for _, _, polys in features for p in polys for r in p])
+    x0, y0 = coords.min(axis=0)
+    x1, y1 = coords.max(axis=0)
+    kx = (x1 - x0) / (QUANTIZATION - 1) or 1.0
+    ky = (y1 - y0) / (QUANTIZATION - 1) or 1.0
+
+    def quantize(ring):
+        q = np.round((ring - [x0, y0]) / [kx, ky]).astype(np.int64)
+        q = q[np.r_[True, (np.diff(q, axis=0) != 0).any(axis=1)]]
+        if (q[0] != q[-1]).any():
+            q = np.vstack([q, q[:1]])
+        return [tuple(p) for p in q.tolist()]
+
+    shapes = [
+        (iso, name, [[r for r in map(quantize, p) if len(r) >= 4] for p in polys])
+        for iso, name, polys in features
+    ]
+
+    # Junctions: points seen with different neighbour pairs
+    neighbours, junctions = {}, set()
+    for _, _, polys in shapes:
+        for p in polys:
+            for ring in p:
+                body = ring[:-1]
+                for i, pt in enumerate(body):
+                    pair = frozenset((body[i - 1], body[(i + 1) % len(body)]))
+                    seen = neighbours.setdefault(pt, pair)
+                    if seen != pair:
+                        junctions.add(pt)
+
+    arcs, arc_index = [], {}
+
+    def arc_ref(points):
+        key = tuple(points)
+        if key in arc_index:
+            return arc_index[key]
+        if key[::-1] in arc_index:
+            return ~arc_index[key[::-1]]
+        arc_index[key] = len(arcs)
+        arcs.append(np.array(points, dtype=np.int64))
+        return arc_index[key]
+
+    def ring_refs(ring):
+        body = ring[:-1]
+        cuts = [i for i, pt in enumerate(body) if pt in junctions]
+        if not cuts:
+            canonical = _canonical_ring(ring)
+            reverse = _canonical_ring(ring[::-1])
+            if reverse in arc_index:
+                return [~arc_index[reverse]]
+            return [arc_ref(canonical)]
+        body = body[cuts[0]:] + body[:cuts[0]]
+        cuts = [c - cuts[0] for c in cuts] + [len(body)]
+        body = body + [body[0]]
+        return [arc_ref(body[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+    geometries = []
+    for iso, name, polys in shapes:
+        polys = [p for p in polys if p]
+        if not polys:
+            continue
+        pts = np.vstack([np.array(p[0]) for p in polys])
+        bbox = [
+            round(float(v), 4)
+            for v in (*(pts.min(axis=0) * [kx, ky] + [x0, y0]), *(pts.max(axis=0) * [kx, ky] + [x0, y0]))
+        ]
+        refs = [[ring_refs(r) for r in p] for p in polys]
+        geometries.append(
+            {
+                "type": "Polygon" if len(refs) == 1 else "MultiPolygon",
+                "arcs": refs[0] if len(refs) == 1 else refs,
+                "id": iso,
+                "properties": {"name": name, "iso": iso, "bbox": bbox},
+            }
+        )
+
+    transform = {"scale": [kx, ky], "translate": [x0, y0]}
+    return geometries, arcs, transform
+
+
+def write_levels(geojson_path: str, boundary_dir: str = BOUNDARY_DIR) -> dict:
+    """
+    Builds the topology once and writes one simplified, delta-encoded
+    TopoJSON file per level. Shared borders are simplified once, so
+    neighbouring countries keep matching edges. Returns {level: bytes written}.
+    """
+    geometries, arcs, transform = build_topology(geojson_path)
+    os.makedirs(boundary_dir, exist_ok=True)
+    sizes = {}
+    for name, tolerance, _ in LEVELS:
+        tol = tolerance / max(transform["scale"])
+        encoded = []
+        for arc in arcs:
+            pts = _simplify_arc(arc, tol)
+            encoded.append(np.vstack([pts[:1], np.diff(pts, axis=0)]).tolist())
+        topology = {
+            "type": "Topology",
+            "transform": transform,
+            "objects": {OBJECT_NAME: {"type": "GeometryCollection", "geometries": geometries}},
+            "arcs": encoded,
+        }
+        text = json.dumps(topology, separators=(",", ":"))
+        with open(level_path(name, boundary_dir), "w", encoding="utf-8") as f:
+            f.write(text)
+        sizes[name] = len(text)
+    return sizes
+
+
+if __name__ == "__main__":
+    # Build step: python geo_store.py <countries.geojson> [boundary_dir]
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else BOUNDARY_DIR
+    for level, size in write_levels(source, target).items():
+        print(f"{level:<8} {size / 1024:8.1f} KiB  {level_path(level, target)}")
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from timeseries import INTERNAL_COLUMNS
+
+
+# -------------------------------------------------
+# Error bars / confidence intervals, precomputed per dataset
+# -------------------------------------------------
+# Error bar mode -> (multiplier, column prefix); None multiplier = t-based on n
+CI_MODES = {
+    "95% Confidence Interval": (1.96, "ci95"),
+    "90% Confidence Interval": (1.645, "ci90"),
+    "99% Confidence Interval": (2.576, "ci99"),
+    "95% CI (t, small samples)": (None, "ci95t"),
+    "Standard Error": (1.0, "ci_se"),
+}
+
+# Two-sided 95% Student t critical values for df = 1..30
+_T95 = np.array([
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+])
+# Beyond the table: interpolate in 1/df between these anchors (1/inf = 0 -> z)
+_T95_TAIL_INV_DF = np.array([0.0, 1 / 120, 1 / 60, 1 / 40, 1 / 30])
+_T95_TAIL = np.array([1.960, 1.980, 2.000, 2.021, 2.042])
+
+
+def t_critical_95(n) -> np.ndarray:
+    """Two-sided 95% t multiplier for sample sizes n (df = n - 1); 1.96 where n is missing."""
+    df = np.asarray(n, dtype=float) - 1
+    out = np.full(df.shape, 1.96)
+
+    small = (df >= 1) & (df <= 30)
+    out[small] = _T95[df[small].astype(int) - 1]
+
+    large = df > 30
+    out[large] = np.interp(1 / df[large], _T95_TAIL_INV_DF, _T95_TAIL)
+    return out
+
+
+def add_ci_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds '<prefix>_low' / '<prefix>_high' float32 columns for every CI_MODES entry
+    in one vectorized pass. Frames without 'se' get empty (NaN) bounds.
+    """
+    value = df["value"].to_numpy(dtype=float)
+    if "se" in df.columns:
+        se = df["se"].to_numpy(dtype=float)
+    else:
+        se = np.full(len(df), np.nan)
+
+    bounds = {}
+    for mult, prefix in CI_MODES.values():
+        if mult is None:
+            n = df["n"].to_numpy(dtype=float) if "n" in df.columns else np.full(len(df), np.nan)
+            half = t_critical_95(n) * se
+        else:
+            half = mult * se
+        bounds[f"{prefix}_low"] = (value - half).astype(np.float32)
+        bounds[f"{prefix}_high"] = (value + half).astype(np.float32)
+
+    return df.assign(**bounds)
+
+
+def ci_columns(mode: str):
+    """Returns the (low, high) column names for an error bar mode, or None."""
+    if mode not in CI_MODES:
+        return None
+    _, prefix = CI_MODES[mode]
+    return f"{prefix}_low", f"{prefix}_high"
+
+
+def select_ci(df: pd.DataFrame, mode: str) -> pd.DataFrame:
+    """
+    Keeps only the bounds of the chosen mode, renamed to 'ci_low' / 'ci_high'
+    (used for exports and the data preview).
+    """
+    all_cols = [c for pair in map(ci_columns, CI_MODES) for c in pair]
+    cols = ci_columns(mode)
+    out = df.drop(columns=[c for c in all_cols if c in df.columns and (cols is None or c not in cols)])
+    if cols is None:
+        return out
+    return out.rename(columns={cols[0]: "ci_low", cols[1]: "ci_high"})
+
+
+def export_frame(df: pd.DataFrame, mode: str) -> pd.DataFrame:
+    """Rows as exported and previewed: the chosen mode's bounds, without the internal series columns."""
+    return select_ci(df, mode).drop(columns=[c for c in INTERNAL_COLUMNS if c in df.columns])
@@ -0,0 +1,253 @@
+"""
+Headless load test for the dashboard.
+
+Drives N concurrent simulated analysts through RTNew.py with Streamlit's
+AppTest (one AppTest = one session, all sharing this process's caches, as
+sessions of one server instance do) and reports rerun latency percentiles
+per interaction and cache hit rates. Memory per session is measured in a
+separate pass afterwards: tracemalloc slows every allocation down, so it
+is never on while latencies are timed.
+
+Usage:
+    python loadtest.py --sessions 8 --iterations 3
+    python loadtest.py --memory-sessions 0      # latency only
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+try:
+    import resource  # peak RSS; Unix only
+except ImportError:
+    resource = None
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "RTNew.py")
+
+
+# -------------------------------------------------
+# Cache hit / miss counting
+# -------------------------------------------------
+# Counts per cached function by wrapping Streamlit's (internal) hit/miss
+# handlers; if those move in a future release, hit rates are reported as n/a.
+cache_counts = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def instrument_caches() -> bool:
+    try:
+        from streamlit.runtime.caching.cache_utils import CachedFunc
+    except ImportError:
+        return False
+    if not (hasattr(CachedFunc, "_handle_cache_hit") and hasattr(CachedFunc, "_handle_cache_miss")):
+        return False
+
+    on_hit, on_miss = CachedFunc._handle_cache_hit, CachedFunc._handle_cache_miss
+
+    def counted_hit(self, *args, **kwargs):
+        cache_counts[self._info.func.__qualname__]["hits"] += 1
+        return on_hit(self, *args, **kwargs)
+
+    def counted_miss(self, *args, **kwargs):
+        cache_counts[self._info.func.__qualname__]["misses"] += 1
+        return on_miss(self, *args, **kwargs)
+
+    CachedFunc._handle_cache_hit = counted_hit
+    CachedFunc._handle_cache_miss = counted_miss
+    return True
+
+
+# -------------------------------------------------
+# Interaction sequence of one analyst
+# -------------------------------------------------
+def _sidebar_widget(at, kind: str, label: str):
+    return next(w for w in getattr(at.sidebar, kind) if w.label == label)
+
+
+def switch_domain(at, rng):
+    box = _sidebar_widget(at, "selectbox", "Domain")
+    box.set_value(rng.choice(box.options))
+
+
+def select_all(at, rng):
+    _sidebar_widget(at, "button", "Select All").click()
+
+
+def pick_countries(at, rng):
+    box = _sidebar_widget(at, "multiselect", "Countries")
+    box.set_value(rng.sample(box.options, rng.randint(1, len(box.options))))
+
+
+def change_layout(at, rng):
+    radio = _sidebar_widget(at, "radio", "Plot layout")
+    radio.set_value(rng.choice(radio.options))
+
+
+def export_package(at, rng):
+    next(b for b in at.button if b.label == "Build report package").click()
+
+
+SCENARIO = [
+    ("domain switch", switch_domain),
+    ("select all", select_all),
+    ("countries", pick_countries),
+    ("layout", change_layout),
+    ("export", export_package),
+]
+
+
+# AppTest compiles the script on a session's first run, and concurrent
+# compilation is not thread-safe, so first runs are serialised.
+_first_run_lock = threading.Lock()
+
+
+def run_session(session_id: int, iterations: int, timeout: float, steps: list) -> tuple:
+    """
+    Runs one session.
+    Returns ([(step, seconds, error or None), ...], the session's AppTest).
+    """
+    rng = random.Random(session_id)
+    timings = []
+
+    def timed(step, action=None):
+        start = time.perf_counter()
+        try:
+            if action is not None:
+                action(at, rng)
+                at.run(timeout=timeout)
+            else:
+                with _first_run_lock:
+                    start = time.perf_counter()
+                    at.run(timeout=timeout)
+            error = at.exception[0].message if at.exception else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        timings.append((step, time.perf_counter() - start, error))
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed("initial load")
+    for _ in range(iterations):
+        for step, action in steps:
+            timed(step, action)
+    return timings, at
+
+
+def measure_session_memory(sessions: int, timeout: float, steps: list) -> list:
+    """
+    Memory pass, run after the timed one: sessions run one at a time with
+    tracemalloc on, against the caches the timed pass already filled, and
+    are kept alive. Per session, 'retained' is the traced growth it leaves
+    behind (session state, widget trees, its share of new cache entries)
+    and 'peak' the extra traced memory its reruns needed at most.
+
+    Returns [(retained bytes, peak bytes), ...].
+    """
+    kept, usage = [], []
+    tracemalloc.start()
+    try:
+        for session_id in range(sessions):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            kept.append(run_session(10_000 + session_id, 1, timeout, steps)[1])
+            current, peak = tracemalloc.get_traced_memory()
+            usage.append((current - before, peak - before))
+    finally:
+        tracemalloc.stop()
+    return usage
+
+
+# -------------------------------------------------
+# Report
+# -------------------------------------------------
+def report(timings: list, sessions: int, wall: float, rss_growth: int, memory: list, counts: dict):
+    by_step = defaultdict(list)
+    errors = defaultdict(int)
+    first_error = {}
+    for step, secs, error in timings:
+        by_step[step].append(secs)
+        if error:
+            errors[step] += 1
+            first_error.setdefault(step, error)
+    by_step["ALL"] = [secs for _, secs, _ in timings]
+
+    print(f"\n{sessions} sessions, {len(timings)} reruns in {wall:.1f}s "
+          f"({len(timings) / wall:.1f} reruns/s)\n")
+    print(f"{'step':<16}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for step, values in by_step.items():
+        p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+        n_err = sum(errors.values()) if step == "ALL" else errors[step]
+        print(f"{step:<16}{len(values):>6}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{n_err:>8}")
+
+    for step, error in first_error.items():
+        print(f"  first error in '{step}': {error.splitlines()[0][:200]}")
+
+    print(f"\nProcess peak RSS growth during the timed pass: {rss_growth / 1e6:.1f} MB "
+          f"(whole process: shared caches plus {sessions} sessions)")
+    if memory:
+        retained, peak = (np.array(m) / 1e6 for m in zip(*memory))
+        print(f"Memory per session ({len(memory)} sessions, separate tracemalloc pass): "
+              f"retained median {np.median(retained):.1f} MB (max {retained.max():.1f}), "
+              f"rerun peak median {np.median(peak):.1f} MB (max {peak.max():.1f})")
+
+    if counts:
+        print(f"\n{'cached function':<28}{'hits':>8}{'misses':>8}{'hit rate':>10}")
+        for name, c in sorted(counts.items()):
+            total = c["hits"] + c["misses"]
+            print(f"{name:<28}{c['hits']:>8}{c['misses']:>8}{c['hits'] / total:>10.1%}")
+    else:
+        print("\nCache hit rates: n/a")
+
+
+def _peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=2, help="scenario repetitions per session")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout (s)")
+    parser.add_argument("--skip", nargs="*", default=[], choices=[s for s, _ in SCENARIO],
+                        help="scenario steps to leave out")
+    parser.add_argument("--memory-sessions", type=int, default=2,
+                        help="sessions in the separate memory pass (0 to skip it)")
+    args = parser.parse_args()
+
+    # The app resolves the bundled workbook relative to the working directory
+    os.chdir(os.path.dirname(APP_PATH))
+    instrument_caches()
+    steps = [(s, a) for s, a in SCENARIO if s not in args.skip]
+
+    rss_before = _peak_rss_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = pool.map(
+            run_session,
+            range(args.sessions),
+            [args.iterations] * args.sessions,
+            [args.timeout] * args.sessions,
+            [steps] * args.sessions,
+        )
+        timings = [t for session, _ in results for t in session]
+    wall = time.perf_counter() - start
+    rss_growth = _peak_rss_bytes() - rss_before
+    # Hit rates of the timed pass only
+    counts = {name: dict(c) for name, c in cache_counts.items()}
+
+    memory = measure_session_memory(args.memory_sessions, args.timeout, steps)
+    report(timings, args.sessions, wall, rss_growth, memory, counts)
+
+
+if __name__ == "__main__":
+    main()
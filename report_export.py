@@ -0,0 +1,218 @@
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+import xlsxwriter
+
+from charts import CHART_COLUMNS, axis_years, indicator_chart
+from intervals import ci_columns
+from search_index import related_items
+from timeseries import years_by_question
+
+try:
+    # Optional: PNG rendering of Vega-Lite specs (pip install vl-convert-python)
+    import vl_convert as vlc
+except ImportError:
+    vlc = None
+
+
+# -------------------------------------------------
+# Bulk report packaging: one zip, per-domain workbooks + chart images
+# -------------------------------------------------
+EXPORT_COLUMNS = ["Country", "Year", "value", "se", "n", "Sheet", "interpolated"]
+DEFINITION_COLUMNS = ["Items Used", "Method", "Interpretation"]
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+_INVALID_FILE_CHARS = re.compile(r'[<>:"/\\|?*&,\s]+')
+
+
+def _file_name(text: str) -> str:
+    return _INVALID_FILE_CHARS.sub("_", str(text)).strip("_") or "untitled"
+
+
+def _file_names(texts: list) -> dict:
+    """{text: unique file-safe name}; names that only differed in replaced characters get a ~k suffix."""
+    used = set()
+    names = {}
+    for text in texts:
+        base = _file_name(text)
+        name, k = base, 2
+        while name.lower() in used:
+            name = f"{base}~{k}"
+            k += 1
+        used.add(name.lower())
+        names[text] = name
+    return names
+
+
+def _sheet_names(questions: list) -> dict:
+    """{Question: unique Excel-safe sheet name (max 31 chars)}, avoiding 'Definitions'."""
+    used = {"definitions"}
+    names = {}
+    for q in questions:
+        base = _INVALID_SHEET_CHARS.sub("_", q)[:31] or "Sheet"
+        name, k = base, 2
+        while name.lower() in used:
+            suffix = f"~{k}"
+            name = base[:31 - len(suffix)] + suffix
+            k += 1
+        used.add(name.lower())
+        names[q] = name
+    return names
+
+
+def _render_chart(chart) -> tuple:
+    """Returns (file extension, bytes): PNG if vl-convert is available, else the Vega-Lite JSON."""
+    spec = chart.to_json()
+    if vlc is not None:
+        return "png", vlc.vegalite_to_png(spec, scale=2)
+    return "vl.json", spec.encode("utf-8")
+
+
+def _build_chart(q_df: pd.DataFrame, title: str, options: dict) -> tuple:
+    """Builds and renders one indicator chart; runs in a worker process (see _render_chart)."""
+    return _render_chart(indicator_chart(q_df, title_text=title, **options))
+
+
+def _write_rows(ws, row: int, values: list, fmt=None) -> int:
+    for col, v in enumerate(values):
+        if v is None or (isinstance(v, float) and pd.isna(v)):
+            continue
+        ws.write(row, col, v, fmt)
+    return row + 1
+
+
+def _write_domain_workbook(path: str, dom_df: pd.DataFrame, questions: list, sheet_names: dict,
+                           ci_cols, schema: dict, item_descs: dict):
+    """
+    Writes one domain workbook: one sheet per indicator plus a 'Definitions'
+    sheet. Uses xlsxwriter's constant_memory mode, so rows are written in
+    order and flushed to disk instead of being kept in memory.
+    """
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True, "nan_inf_to_errors": True})
+    bold = wb.add_format({"bold": True})
+
+    columns = [c for c in EXPORT_COLUMNS if c in dom_df.columns]
+    header = columns + (["ci_low", "ci_high"] if ci_cols else [])
+    columns += list(ci_cols) if ci_cols else []
+
+    for q, q_df in dom_df.groupby("Question", sort=False, observed=True):
+        ws = wb.add_worksheet(sheet_names[q])
+        row = _write_rows(ws, 0, header, bold)
+        for values in q_df[columns].itertuples(index=False, name=None):
+            row = _write_rows(ws, row, [v.item() if hasattr(v, "item") else v for v in values])
+
+    ws = wb.add_worksheet("Definitions")
+    row = _write_rows(ws, 0, ["Indicator", "Sheet"] + DEFINITION_COLUMNS, bold)
+    for q in questions:
+        info = schema.get(q, {})
+        row = _write_rows(
+            ws, row, [q, sheet_names[q]] + [str(info.get(c, "N/A")) for c in DEFINITION_COLUMNS]
+        )
+    row = _write_rows(ws, row + 1, ["Code", "Description", "Indicator"], bold)
+    for q in questions:
+        items = related_items(schema.get(q, {}).get("Items Used", ""), item_descs)
+        for code, desc in sorted(items.items()):
+            row = _write_rows(ws, row, [code, desc, q])
+
+    wb.close()
+
+
+def write_report_package(
+    out,
+    series_df: pd.DataFrame,
+    schema: dict,
+    item_descs: dict,
+    chart_type: str = "Line Chart",
+    graph_style: str = "Colorblind-safe (default)",
+    theme: str = "Academic (light)",
+    error_bar_type: str = "95% Confidence Interval",
+    interpolate: bool = False,
+    max_workers: int = None,
+    progress=None,
+) -> dict:
+    """
+    Writes a zip with, per domain, '<domain>/<domain>.xlsx' (one sheet per
+    indicator + definitions) and '<domain>/charts/<indicator>.png'.
+
+    Domains are processed one at a time: the charts of a domain are built
+    and rendered in worker processes while its workbook is written to a
+    temporary file, and both are streamed into the zip before the next
+    domain starts. Without the optional vl-convert package, charts are
+    stored as Vega-Lite JSON instead.
+
+    Args:
+        out: zip file path or writable binary file object.
+        series_df: series frame with precomputed CI columns (see RTNew.load_series).
+        progress: optional callable(fraction, domain).
+
+    Returns:
+        {"domains": int, "indicators": int, "chart_format": "png" | "vl.json"}
+    """
+    ci_cols = ci_columns(error_bar_type)
+    wave_years = years_by_question(series_df)
+    year_range = (int(series_df["Year"].min()), int(series_df["Year"].max()))
+    domains = sorted(series_df["Domain"].unique())
+    folders = _file_names(domains)
+    chart_columns = [c for c in CHART_COLUMNS + list(ci_cols or []) if c in series_df.columns]
+    n_indicators = 0
+
+    # 'spawn' keeps workers independent of the (threaded) server process
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+        for i, domain in enumerate(domains):
+            if progress is not None:
+                progress(i / len(domains), domain)
+
+            dom_df = series_df[series_df["Domain"] == domain]
+            questions = sorted(dom_df["Question"].unique())
+            sheet_names = _sheet_names(questions)
+            chart_files = _file_names([sheet_names[q] for q in questions])
+            folder = folders[domain]
+
+            # Charts are built and rendered in parallel while the workbook is written;
+            # workers only receive the columns a chart embeds
+            futures = {
+                q: pool.submit(
+                    _build_chart,
+                    dom_df.loc[dom_df["Question"] == q, chart_columns],
+                    q,
+                    dict(
+                        chart_type=chart_type,
+                        graph_style=graph_style,
+                        theme=theme,
+                        chart_years=axis_years([q], wave_years, year_range),
+                        ci_cols=ci_cols,
+                        interpolate=interpolate,
+                    ),
+                )
+                for q in questions
+            }
+
+            fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
+            os.close(fd)
+            try:
+                _write_domain_workbook(
+                    tmp_path, dom_df, questions, sheet_names, ci_cols, schema, item_descs
+                )
+                zf.write(tmp_path, f"{folder}/{folder}.xlsx")
+            finally:
+                os.remove(tmp_path)
+
+            for q, future in futures.items():
+                ext, payload = future.result()
+                zf.writestr(f"{folder}/charts/{chart_files[sheet_names[q]]}.{ext}", payload)
+            n_indicators += len(questions)
+
+    if progress is not None:
+        progress(1.0, None)
+
+    return {
+        "domains": len(domains),
+        "indicators": n_indicators,
+        "chart_format": "png" if vlc is not None else "vl.json",
+    }
@@ -0,0 +1,171 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+
+# -------------------------------------------------
+# Indicator search: inverted index over names, schema fields and items
+# -------------------------------------------------
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_RANGE_RE = re.compile(r"([A-Z]\d+)[-–—]([A-Z]\d+)")
+
+# Field weights: a hit in the indicator name ranks above one in an item text
+FIELD_WEIGHTS = {"name": 3.0, "schema": 2.0, "item": 1.0}
+
+
+def tokenize(text) -> list:
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def related_items(items_used: str, item_descs: dict) -> dict:
+    """
+    Returns {Code: Description} for the items referenced by an 'Items Used'
+    string, by exact substring or by ranges such as A065–A074.
+    """
+    items_used = str(items_used)
+    ranges = _RANGE_RE.findall(items_used)
+    related = {}
+    for code, desc in item_descs.items():
+        # 1) Exact substring match
+        if code in items_used:
+            related[code] = desc
+            continue
+        # 2) Range parsing, e.g. A065–A074
+        for start, end in ranges:
+            if start[0] == end[0] == code[0]:
+                try:
+                    if int(start[1:]) <= int(code[1:]) <= int(end[1:]):
+                        related[code] = desc
+                        break
+                except ValueError:
+                    pass
+    return related
+
+
+def domain_index(long_df) -> dict:
+    """{Domain: sorted questions}, domains sorted: the sidebar's domain and indicator lists."""
+    grouped = long_df.groupby("Domain", sort=True, observed=True)["Question"].unique()
+    return {str(d): sorted(str(q) for q in questions) for d, questions in grouped.items()}
+
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index from tokens to indicators (questions).
+
+    Each term of a query matches tokens exactly or by prefix (binary search
+    over the sorted vocabulary); terms without such a match fall back to
+    fuzzy matching through a trigram index. Terms are AND-ed.
+    """
+
+    def __init__(self, questions_by_domain: dict, schema: dict, item_descs: dict):
+        """
+        Args:
+            questions_by_domain: {Domain: [Question, ...]} from the loaded dataset.
+            schema, item_descs: as returned by load_definitions().
+        """
+        self.domains = defaultdict(set)
+        postings = defaultdict(dict)
+
+        def add(text, question, weight):
+            for tok in tokenize(text):
+                postings[tok][question] = max(postings[tok].get(question, 0.0), weight)
+
+        for domain, questions in questions_by_domain.items():
+            for q in questions:
+                self.domains[q].add(domain)
+                add(q, q, FIELD_WEIGHTS["name"])
+                info = schema.get(q)
+                if not info:
+                    continue
+                add(info.get("Interpretation", ""), q, FIELD_WEIGHTS["schema"])
+                add(info.get("Method", ""), q, FIELD_WEIGHTS["schema"])
+                for code, desc in related_items(info.get("Items Used", ""), item_descs).items():
+                    add(code, q, FIELD_WEIGHTS["item"])
+                    add(desc, q, FIELD_WEIGHTS["item"])
+
+        self.postings = dict(postings)
+        self._build_lookups()
+
+    def _build_lookups(self):
+        """Sorted vocabulary and trigram index, derived from the postings."""
+        self.vocab = sorted(self.postings)
+        self.trigrams = defaultdict(set)
+        for tok in self.vocab:
+            for tri in _trigrams(tok):
+                self.trigrams[tri].add(tok)
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form (e.g. for the warm-up's manifest); see from_dict."""
+        return {
+            "postings": self.postings,
+            "domains": {q: sorted(d) for q, d in self.domains.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchIndex":
+        """Rebuilds an index saved with to_dict without re-reading the definitions."""
+        index = cls.__new__(cls)
+        index.domains = defaultdict(set, {q: set(d) for q, d in data["domains"].items()})
+        index.postings = data["postings"]
+        index._build_lookups()
+        return index
+
+    def _prefix_tokens(self, term: str) -> list:
+        i = bisect_left(self.vocab, term)
+        out = []
+        while i < len(self.vocab) and self.vocab[i].startswith(term):
+            out.append(self.vocab[i])
+            i += 1
+        return out
+
+    def _fuzzy_tokens(self, term: str, min_similarity: float = 0.4) -> dict:
+        """{token: Jaccard trigram similarity} for vocabulary tokens close to term."""
+        grams = _trigrams(term)
+        shared = defaultdict(int)
+        for tri in grams:
+            for tok in self.trigrams.get(tri, ()):
+                shared[tok] += 1
+        scored = {}
+        for tok, n in shared.items():
+            sim = n / (len(grams) + len(_trigrams(tok)) - n)
+            if sim >= min_similarity:
+                scored[tok] = sim
+        return scored
+
+    def _match_term(self, term: str) -> dict:
+        """{question: score} for one query term."""
+        scores = defaultdict(float)
+        tokens = self._prefix_tokens(term)
+        if tokens:
+            for tok in tokens:
+                # Whole-token hits rank above prefix-only hits
+                boost = 1.0 if tok == term else 0.8
+                for q, w in self.postings[tok].items():
+                    scores[q] = max(scores[q], w * boost)
+        else:
+            for tok, sim in self._fuzzy_tokens(term).items():
+                for q, w in self.postings[tok].items():
+                    scores[q] = max(scores[q], w * sim * 0.6)
+        return scores
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Returns matching questions, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        total = None
+        for term in terms:
+            scores = self._match_term(term)
+            if total is None:
+                total = dict(scores)
+            else:
+                total = {q: s + scores[q] for q, s in total.items() if q in scores}
+            if not total:
+                return []
+        ranked = sorted(total, key=lambda q: (-total[q], q))
+        return ranked[:limit] if limit else ranked
@@ -0,0 +1,179 @@
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+
+
+# -------------------------------------------------
+# Shared, memory-mapped dataset store for multi-process deployments
+# -------------------------------------------------
+# Layout of a shared directory:
+#   CURRENT                      name of the live version (swapped atomically)
+#   <version>/dataset.arrow      parsed long frame, Arrow IPC file (uncompressed)
+#   <version>/manifest.json      source fingerprint, load stats, definitions
+#   <version>/<frame>.arrow      further frames published with the version (optional)
+CURRENT_FILE = "CURRENT"
+DATASET_FILE = "dataset.arrow"
+MANIFEST_FILE = "manifest.json"
+KEEP_VERSIONS = 2
+VERSION_PATTERN = re.compile(r"v\d+-[0-9a-f]{8}")
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    Converts the long frame, keeping float NaN as values rather than nulls so
+    float columns can later be viewed from the memory map without a copy.
+    """
+    arrays = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_float_dtype(s.dtype):
+            arrays[col] = pa.array(s.to_numpy(), from_pandas=False)
+        else:
+            arrays[col] = pa.array(s, from_pandas=True)
+    return pa.table(arrays)
+
+
+def _write_frame(path: str, df: pd.DataFrame):
+    """
+    Writes df as an Arrow IPC file. A named index is stored as leading
+    columns and listed in the schema metadata, so _read_frame restores it.
+    """
+    index = [n for n in df.index.names if n is not None]
+    table = _to_arrow(df.reset_index() if index else df.reset_index(drop=True))
+    table = table.replace_schema_metadata(
+        {"index": json.dumps(index), "columns": json.dumps(df.columns.name)}
+    )
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    """Maps a file written by _write_frame read-only (numeric columns without a copy)."""
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    metadata = table.schema.metadata or {}
+    index = json.loads(metadata.get(b"index", b"[]"))
+    df = table.to_pandas(split_blocks=True)
+    if index:
+        df = df.set_index(index)
+    df.columns.name = json.loads(metadata.get(b"columns", b"null"))
+    return df
+
+
+def _write_atomic(path: str, text: str):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def is_version(name: str) -> bool:
+    """True for a version name as created by publish (as opposed to e.g. a source fingerprint)."""
+    return VERSION_PATTERN.fullmatch(name) is not None
+
+
+def current_version(shared_dir: str):
+    """Returns the live version name, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(shared_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(shared_dir: str, version: str) -> dict:
+    with open(os.path.join(shared_dir, version, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish(shared_dir: str, long_df: pd.DataFrame, load_stats: pd.DataFrame,
+            schema: dict, item_descs: dict, fingerprint: str = None, extras: dict = None,
+            frames: dict = None) -> str:
+    """
+    Writes a new version directory, then atomically points CURRENT at it.
+    Readers never see a partially written version. Returns the version name.
+
+    extras: further JSON-serialisable manifest entries (e.g. warm-up artifacts).
+    frames: {name: DataFrame} written next to the dataset (see open_frame).
+    """
+    os.makedirs(shared_dir, exist_ok=True)
+    version = f"v{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    staging = os.path.join(shared_dir, f".{version}.staging")
+    os.makedirs(staging)
+
+    _write_frame(os.path.join(staging, DATASET_FILE), long_df.reset_index(drop=True))
+    for name, df in (frames or {}).items():
+        _write_frame(os.path.join(staging, f"{name}.arrow"), df)
+
+    manifest = {
+        "fingerprint": fingerprint,
+        "rows": len(long_df),
+        "load_stats": load_stats.to_dict(orient="list"),
+        "schema": schema,
+        "item_descs": item_descs,
+        "frames": sorted(frames or {}),
+        **(extras or {}),
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, default=str)
+
+    os.rename(staging, os.path.join(shared_dir, version))
+    _write_atomic(os.path.join(shared_dir, CURRENT_FILE), version)
+    _prune(shared_dir, keep=version)
+    return version
+
+
+def _prune(shared_dir: str, keep: str):
+    """Removes all but the newest KEEP_VERSIONS versions (best effort)."""
+    versions = sorted(
+        d for d in os.listdir(shared_dir)
+        if is_version(d) and os.path.isdir(os.path.join(shared_dir, d))
+    )
+    for old in versions[:-KEEP_VERSIONS]:
+        if old != keep:
+            # Mapped files stay readable for workers that still use them (POSIX);
+            # where removal fails (e.g. Windows), the next publish retries.
+            shutil.rmtree(os.path.join(shared_dir, old), ignore_errors=True)
+
+
+def open_version(shared_dir: str, version: str) -> tuple:
+    """
+    Maps a published version read-only.
+
+    Returns:
+        long_df (DataFrame): columns backed by the memory map (no copy for
+            numeric columns; strings stay Arrow-backed)
+        manifest (dict): 'fingerprint', 'load_stats', 'schema', 'item_descs',
+            'frames' and any extras
+    """
+    manifest = read_manifest(shared_dir, version)
+    return _read_frame(os.path.join(shared_dir, version, DATASET_FILE)), manifest
+
+
+def open_frame(shared_dir: str, version: str, name: str) -> pd.DataFrame:
+    """Maps one of the frames published with a version (see publish) read-only."""
+    return _read_frame(os.path.join(shared_dir, version, f"{name}.arrow"))
+
+
+if __name__ == "__main__":
+    # Loader process: python shared_store.py <data file> <shared_dir>
+    from data_loader import read_definitions
+    from sources import load_source, source_fingerprint
+
+    workbook, shared_dir = sys.argv[1], sys.argv[2]
+    long_df, load_stats = load_source(workbook)
+
+    definitions = os.path.join(os.path.dirname(os.path.abspath(workbook)), "Indicator_Definitions.xlsx")
+    schema, item_descs = read_definitions(definitions) if os.path.exists(definitions) else ({}, {})
+
+    version = publish(
+        shared_dir, long_df, load_stats, schema, item_descs, source_fingerprint(workbook)
+    )
+    print(f"Published {len(long_df)} rows as {version} in {shared_dir}")
@@ -0,0 +1,296 @@
+"""
+Golden-snapshot check of generated chart specs and exports.
+
+Builds the Vega-Lite spec of every combination of chart type, layout,
+graph style, theme and error bar mode on fixed fixture data (plus the
+CSV export of every error bar mode), compares them with the snapshots
+stored in snapshots/ and enforces per-combination build-time and
+payload-size budgets. Exits with status 1 on any difference or breach,
+so it can gate refactors of charts.py / intervals.py in CI.
+
+Usage:
+    python snapshots.py                  # check against the stored snapshots
+    python snapshots.py --update         # accept the current output as the new snapshots
+    python snapshots.py --time-budget-ms 250
+"""
+import argparse
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from charts import (
+    CHART_TYPES,
+    GRAPH_STYLES,
+    LAYOUTS,
+    MAP_LAYOUT,
+    THEMES,
+    axis_years,
+    choropleth_chart,
+    country_panel_chart,
+    indicator_chart,
+)
+from intervals import CI_MODES, add_ci_columns, ci_columns, export_frame
+from timeseries import build_series, years_by_question
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots", "golden.json.gz")
+ERROR_BAR_MODES = list(CI_MODES) + ["None"]
+
+# Budgets per combination: build + serialisation time (Altair validation
+# included, as in st.altair_chart), payload growth over the snapshot, and an
+# absolute payload ceiling
+TIME_BUDGET_MS = 500
+PAYLOAD_GROWTH = 0.10
+PAYLOAD_BUDGET_BYTES = 100_000
+
+
+# -------------------------------------------------
+# Fixture data
+# -------------------------------------------------
+FIXTURE_COUNTRIES = ["Bulgaria", "Finland", "Sweden"]
+FIXTURE_QUESTIONS = ["Trust", "Voice"]
+FIXTURE_YEARS = [1990, 1999, 2008, 2017]
+
+
+def fixture_series() -> pd.DataFrame:
+    """Small deterministic series frame (with a missing wave) shaped like load_series output."""
+    rows = []
+    for qi, q in enumerate(FIXTURE_QUESTIONS):
+        for ci, country in enumerate(FIXTURE_COUNTRIES):
+            for yi, year in enumerate(FIXTURE_YEARS):
+                if country == "Sweden" and year == 1999:
+                    continue
+                rows.append(
+                    {
+                        "Domain": "Fixture",
+                        "Question": q,
+                        "Country": country,
+                        "Year": year,
+                        "value": round(2.0 + 0.25 * qi + 0.1 * ci + 0.05 * yi * (ci - 1), 4),
+                        "se": round(0.02 + 0.005 * ci + 0.003 * yi, 4),
+                        "n": 800 + 100 * ci + 10 * yi,
+                        "Sheet": "Fixture",
+                    }
+                )
+    return add_ci_columns(build_series(pd.DataFrame(rows)))
+
+
+# Two unit squares sharing an edge, ids matching FIXTURE_COUNTRIES[:2]
+FIXTURE_TOPOLOGY = {
+    "type": "Topology",
+    "transform": {"scale": [0.001, 0.001], "translate": [20.0, 60.0]},
+    "objects": {
+        "countries": {
+            "type": "GeometryCollection",
+            "geometries": [
+                {"type": "Polygon", "arcs": [[0, 1]], "id": "BGR", "properties": {"iso": "BGR"}},
+                {"type": "Polygon", "arcs": [[2, ~0]], "id": "FIN", "properties": {"iso": "FIN"}},
+            ],
+        }
+    },
+    "arcs": [
+        [[1000, 0], [0, 1000]],
+        [[1000, 1000], [-1000, 0], [0, -1000], [1000, 0]],
+        [[1000, 1000], [1000, 0], [0, -1000], [-1000, 0]],
+    ],
+}
+
+
+# -------------------------------------------------
+# Generation
+# -------------------------------------------------
+def combinations() -> list:
+    """(name, builder) for every chart combination; builders return a Vega-Lite dict."""
+    series_df = fixture_series()
+    wave_years = years_by_question(series_df)
+    year_range = (min(FIXTURE_YEARS), max(FIXTURE_YEARS))
+    q_data = series_df[series_df["Question"] == FIXTURE_QUESTIONS[0]]
+    c_data = series_df[series_df["Country"] == FIXTURE_COUNTRIES[0]]
+    map_data = q_data[q_data["Year"] == max(FIXTURE_YEARS)].head(2).assign(iso=["BGR", "FIN"])
+
+    combos = []
+    # The map layout is covered on the fixture topology, whether or not
+    # boundaries are built in this checkout
+    for layout in LAYOUTS + [MAP_LAYOUT]:
+        if layout == MAP_LAYOUT:
+            # Maps ignore chart type, graph style and error bars
+            for theme in THEMES:
+                combos.append((
+                    f"{layout} | {theme}",
+                    lambda theme=theme: choropleth_chart(
+                        FIXTURE_TOPOLOGY, map_data, "Fixture map", theme
+                    ).to_dict(),
+                ))
+            continue
+
+        for chart_type, style, theme, mode in itertools.product(CHART_TYPES, GRAPH_STYLES, THEMES, ERROR_BAR_MODES):
+            name = f"{layout} | {chart_type} | {style} | {theme} | {mode}"
+            if layout == "Country panels":
+                build = lambda chart_type=chart_type, style=style, theme=theme, mode=mode: country_panel_chart(
+                    c_data,
+                    title_text=FIXTURE_COUNTRIES[0],
+                    chart_type=chart_type,
+                    graph_style=style,
+                    theme=theme,
+                    chart_years=axis_years(FIXTURE_QUESTIONS, wave_years, year_range),
+                    ci_cols=ci_columns(mode),
+                ).to_dict()
+            else:
+                build = lambda chart_type=chart_type, style=style, theme=theme, mode=mode: indicator_chart(
+                    q_data,
+                    title_text=FIXTURE_QUESTIONS[0],
+                    chart_type=chart_type,
+                    graph_style=style,
+                    theme=theme,
+                    chart_years=axis_years(FIXTURE_QUESTIONS[:1], wave_years, year_range),
+                    ci_cols=ci_columns(mode),
+                    focal_country=FIXTURE_COUNTRIES[0],
+                ).to_dict()
+            combos.append((name, build))
+    return combos
+
+
+def exports() -> dict:
+    """{error bar mode: CSV export of the fixture data}."""
+    series_df = fixture_series()
+    return {mode: export_frame(series_df, mode).to_csv(index=False) for mode in ERROR_BAR_MODES}
+
+
+def _canonical(spec: dict) -> str:
+    # The schema URL only tracks the installed Altair version
+    return json.dumps({k: v for k, v in spec.items() if k != "$schema"}, sort_keys=True, separators=(",", ":"))
+
+
+def generate(time_budget_ms: float, retries: int) -> dict:
+    """
+    Builds every chart once; a chart over the time budget is rebuilt up to
+    `retries` more times and keeps its best time, so one slow run (GC, a busy
+    machine) does not fail the check.
+    """
+    charts = {}
+    for name, build in combinations():
+        best = float("inf")
+        for _ in range(1 + retries):
+            start = time.perf_counter()
+            payload = _canonical(build())
+            best = min(best, (time.perf_counter() - start) * 1000)
+            if best <= time_budget_ms:
+                break
+        charts[name] = {"spec": json.loads(payload), "bytes": len(payload), "ms": best}
+    return {"charts": charts, "exports": exports()}
+
+
+# -------------------------------------------------
+# Comparison
+# -------------------------------------------------
+def _diff_paths(old, new, path="", limit=5) -> list:
+    """First few JSON paths where two specs differ."""
+    if type(old) is not type(new):
+        return [path or "/"]
+    if isinstance(old, dict):
+        out = []
+        for key in sorted(set(old) | set(new)):
+            if key not in old or key not in new:
+                out.append(f"{path}/{key}")
+            else:
+                out += _diff_paths(old[key], new[key], f"{path}/{key}", limit)
+            if len(out) >= limit:
+                break
+        return out[:limit]
+    if isinstance(old, list):
+        if len(old) != len(new):
+            return [f"{path} (length {len(old)} -> {len(new)})"]
+        out = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            out += _diff_paths(a, b, f"{path}/{i}", limit)
+            if len(out) >= limit:
+                break
+        return out[:limit]
+    return [] if old == new else [path or "/"]
+
+
+def check(current: dict, golden: dict, time_budget_ms: float) -> list:
+    """Returns failure messages (empty when everything matches and fits the budgets)."""
+    failures = []
+    old_charts = golden["charts"]
+    for name in sorted(set(old_charts) - set(current["charts"])):
+        failures.append(f"missing combination: {name}")
+
+    for name, result in current["charts"].items():
+        old = old_charts.get(name)
+        if old is None:
+            failures.append(f"new combination without snapshot (run --update): {name}")
+            continue
+        if _canonical(result["spec"]) != _canonical(old["spec"]):
+            paths = ", ".join(_diff_paths(old["spec"], result["spec"]))
+            failures.append(f"spec changed: {name}\n      at {paths}")
+        if result["ms"] > time_budget_ms:
+            failures.append(f"too slow: {name}: {result['ms']:.0f} ms > {time_budget_ms:.0f} ms")
+        payload_budget = min(old["bytes"] * (1 + PAYLOAD_GROWTH), PAYLOAD_BUDGET_BYTES)
+        if result["bytes"] > payload_budget:
+            failures.append(
+                f"payload over budget: {name}: {result['bytes']} B > {payload_budget:.0f} B "
+                f"(snapshot {old['bytes']} B)"
+            )
+
+    for mode, csv in current["exports"].items():
+        if golden["exports"].get(mode) != csv:
+            failures.append(f"CSV export changed: {mode}")
+    return failures
+
+
+def save(current: dict, path: str = SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    golden = {
+        "charts": {n: {"spec": r["spec"], "bytes": r["bytes"]} for n, r in current["charts"].items()},
+        "exports": current["exports"],
+    }
+    # mtime=0 keeps the file byte-identical when nothing changed
+    with gzip.GzipFile(path, "wb", mtime=0) as f:
+        f.write(json.dumps(golden, sort_keys=True, indent=1).encode("utf-8"))
+
+
+def load(path: str = SNAPSHOT_PATH) -> dict:
+    with gzip.open(path, "rb") as f:
+        return json.loads(f.read().decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="write the current output as the snapshots")
+    parser.add_argument("--time-budget-ms", type=float, default=TIME_BUDGET_MS,
+                        help="max build time per combination")
+    parser.add_argument("--retries", type=int, default=2, help="rebuilds of a chart over the time budget")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    current = generate(args.time_budget_ms, args.retries)
+    times = sorted(r["ms"] for r in current["charts"].values())
+    print(f"{len(current['charts'])} chart combinations, {len(current['exports'])} exports "
+          f"in {time.perf_counter() - start:.1f}s (build p50 {times[len(times) // 2]:.1f} ms, "
+          f"max {times[-1]:.1f} ms)")
+
+    if args.update:
+        save(current)
+        print(f"Snapshots written to {SNAPSHOT_PATH}")
+        return
+
+    if not os.path.exists(SNAPSHOT_PATH):
+        sys.exit(f"No snapshots at {SNAPSHOT_PATH}; run with --update first.")
+
+    failures = check(current, load(), args.time_budget_ms)
+    for failure in failures[:50]:
+        print(f"  FAIL {failure}")
+    if len(failures) > 50:
+        print(f"  ... and {len(failures) - 50} more")
+    if failures:
+        sys.exit(1)
+    print("All snapshots match and are within budget.")
+
+
+if __name__ == "__main__":
+    main()
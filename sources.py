@@ -0,0 +1,233 @@
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from data_loader import load_workbook
+
+
+# -------------------------------------------------
+# Data source adapters: every format -> the same typed long frame
+# -------------------------------------------------
+# An adapter is a function (source, progress=None, on_domains=None, name=None)
+# -> (long_df, load_stats), where source is a path or the file's raw bytes
+# (name then gives the file name), with the same contract as
+# data_loader.load_workbook. load_source picks the adapter
+# by file extension and applies the shared typing, so callers never see
+# format differences.
+LONG_COLUMNS = ["Domain", "Question", "Country", "Year", "value", "se", "n", "Sheet"]
+
+# Column names accepted by the tabular adapters (matched case-insensitively)
+COLUMN_ALIASES = {
+    "mean": "value",
+    "standard error": "se",
+    "standard error of mean": "se",
+    "std_error": "se",
+    "count": "n",
+    "wave": "Sheet",
+    "sheet": "Sheet",
+    "domain": "Domain",
+    "question": "Question",
+    "indicator": "Question",
+    "country": "Country",
+    "year": "Year",
+    "value": "value",
+    "se": "se",
+    "n": "n",
+}
+
+SQLITE_TABLE = "long_data"
+
+ADAPTERS = {}
+
+# Preference when the same dataset exists in several formats (fastest first)
+FORMAT_SPEED = [".parquet", ".sqlite", ".db", ".csv", ".xlsx"]
+
+
+def register_adapter(*extensions):
+    """Decorator registering an adapter for the given file extensions."""
+    def register(fn):
+        for ext in extensions:
+            ADAPTERS[ext.lower()] = fn
+        return fn
+    return register
+
+
+def source_fingerprint(source, name: str = None) -> str:
+    """
+    Identifies a source's content: name, size and modification time for a
+    path (no read needed), a content hash for raw bytes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return f"{name or 'upload'}:{len(source)}:{hashlib.sha1(source).hexdigest()}"
+    st = os.stat(source)
+    return f"{os.path.basename(source)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def supported_extensions() -> list:
+    return sorted(ADAPTERS)
+
+
+def find_source(directory: str, stem: str):
+    """
+    Path of the dataset named `stem` in directory (case-insensitive), in the
+    fastest format available. Faster formats are treated as conversions of
+    the slowest one present (usually the workbook) and are only used when
+    they are not older than it, so stale conversions are ignored.
+    Returns None if no supported file exists.
+    """
+    candidates = {}
+    for f in os.listdir(directory):
+        base, ext = os.path.splitext(f)
+        path = os.path.join(directory, f)
+        if base.lower() == stem.lower() and ext.lower() in ADAPTERS and os.path.isfile(path):
+            candidates[ext.lower()] = path
+    if not candidates:
+        return None
+
+    speed = {ext: i for i, ext in enumerate(FORMAT_SPEED)}
+    ordered = sorted(candidates, key=lambda e: speed.get(e, len(speed)))
+    original_mtime = os.stat(candidates[ordered[-1]]).st_mtime
+    return next(candidates[ext] for ext in ordered if os.stat(candidates[ext]).st_mtime >= original_mtime)
+
+
+# --- Shared typing ---
+def to_long_frame(df: pd.DataFrame, default_sheet: str = "Data") -> pd.DataFrame:
+    """
+    Brings a long table to the canonical layout: LONG_COLUMNS with stripped
+    labels, int Year, float value / se / n, rows without value dropped,
+    sorted by Country and Year (as load_workbook returns it).
+    """
+    df = df.rename(columns={c: COLUMN_ALIASES.get(str(c).strip().lower(), c) for c in df.columns})
+    missing = [c for c in ["Domain", "Question", "Country", "Year", "value"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    for col in ["Domain", "Question", "Country"]:
+        out[col] = df[col].astype(str).str.strip()
+    out["Year"] = pd.to_numeric(df["Year"], errors="coerce")
+    for col in ["value", "se", "n"]:
+        out[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else float("nan")
+    out["Sheet"] = df["Sheet"].astype(str).str.strip() if "Sheet" in df.columns else default_sheet
+
+    out = out.dropna(subset=["value", "Year"])
+    out["Year"] = out["Year"].astype(int)
+    return out[LONG_COLUMNS].sort_values(by=["Country", "Year"]).reset_index(drop=True)
+
+
+def _tabular_load(read, source, name, progress, on_domains) -> tuple:
+    """Shared body of the single-read adapters: read, type, report, build stats."""
+    if progress is None:
+        progress = lambda stage, fraction: None
+    start = time.perf_counter()
+    progress("reading", 0.0)
+    long_df = to_long_frame(read(source), default_sheet=os.path.splitext(name)[0] if name else "Data")
+    progress("typing", 1.0)
+    if on_domains is not None:
+        on_domains(sorted(long_df["Domain"].unique()))
+
+    # One read covers every sheet: its time is split by row share
+    secs = time.perf_counter() - start
+    stats = long_df.groupby("Sheet").size().rename("Rows").reset_index()
+    stats["Seconds"] = secs * stats["Rows"] / max(len(long_df), 1)
+    return long_df, stats
+
+
+# --- Adapters ---
+@register_adapter(".xlsx")
+def load_excel(source, progress=None, on_domains=None, name=None) -> tuple:
+    """ResultswithSE.xlsx triplet layout (see data_loader.parse_results_sheet)."""
+    long_df, stats = load_workbook(source, progress=progress, on_domains=on_domains)
+    return to_long_frame(long_df), stats
+
+
+@register_adapter(".csv")
+def load_csv(source, progress=None, on_domains=None, name=None) -> tuple:
+    """Long CSV with one row per (Domain, Question, Country, Year[, Sheet])."""
+    def read(src):
+        return pd.read_csv(io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src)
+    return _tabular_load(read, source, name or _name_of(source), progress, on_domains)
+
+
+@register_adapter(".parquet")
+def load_parquet(source, progress=None, on_domains=None, name=None) -> tuple:
+    """Long Parquet file (same columns as the long CSV)."""
+    def read(src):
+        return pd.read_parquet(io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src)
+    return _tabular_load(read, source, name or _name_of(source), progress, on_domains)
+
+
+@register_adapter(".sqlite", ".db")
+def load_sqlite(source, progress=None, on_domains=None, name=None) -> tuple:
+    """
+    Local SQLite file holding the long table in SQLITE_TABLE (or in its only
+    table). Uploaded bytes are written to a temporary file first.
+    """
+    def read(src):
+        tmp_path = None
+        if isinstance(src, (bytes, bytearray)):
+            fd, tmp_path = tempfile.mkstemp(suffix=".sqlite")
+            with os.fdopen(fd, "wb") as f:
+                f.write(src)
+            src = tmp_path
+        try:
+            with closing(sqlite3.connect(src)) as conn:
+                tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+                table = SQLITE_TABLE if SQLITE_TABLE in tables or len(tables) != 1 else tables[0]
+                return pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+        finally:
+            if tmp_path is not None:
+                os.remove(tmp_path)
+    return _tabular_load(read, source, name or _name_of(source), progress, on_domains)
+
+
+def _name_of(source):
+    return None if isinstance(source, (bytes, bytearray)) else os.path.basename(source)
+
+
+def load_source(source, name: str = None, progress=None, on_domains=None) -> tuple:
+    """
+    Loads any supported source into (long_df, load_stats).
+
+    Args:
+        source: path, or raw bytes (then name gives the file name / extension).
+        progress, on_domains: as for data_loader.load_workbook.
+
+    Raises ValueError for unsupported formats or tables missing required columns.
+    """
+    ext = os.path.splitext(name or _name_of(source) or "")[1].lower()
+    adapter = ADAPTERS.get(ext)
+    if adapter is None:
+        raise ValueError(f"Unsupported data format '{ext}' (supported: {', '.join(supported_extensions())})")
+    return adapter(source, progress=progress, on_domains=on_domains, name=name)
+
+
+# --- Conversion ---
+def write_long(long_df: pd.DataFrame, path: str):
+    """Writes the long frame as CSV, Parquet or SQLite, by extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        long_df.to_csv(path, index=False)
+    elif ext == ".parquet":
+        long_df.to_parquet(path, index=False)
+    elif ext in (".sqlite", ".db"):
+        with closing(sqlite3.connect(path)) as conn:
+            long_df.to_sql(SQLITE_TABLE, conn, if_exists="replace", index=False)
+    else:
+        raise ValueError(f"Cannot write '{ext}' (use .csv, .parquet or .sqlite)")
+
+
+if __name__ == "__main__":
+    # Conversion: python sources.py <source> <target.parquet|.csv|.sqlite>
+    # A converted copy next to the workbook (same name) is picked up by find_source.
+    src, target = sys.argv[1], sys.argv[2]
+    long_df, _ = load_source(src)
+    write_long(long_df, target)
+    print(f"Wrote {len(long_df)} rows to {target}")
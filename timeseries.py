@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# Per-(Question, Country) series with wave gaps
+# -------------------------------------------------
+SERIES_KEYS = ["Domain", "Question", "Country"]
+
+# Bookkeeping columns added by build_series; not part of exports or previews
+INTERNAL_COLUMNS = ["series_id", "gap", "segment"]
+
+
+def build_series(long_df: pd.DataFrame, max_gap: int = 0, interpolate: bool = False) -> pd.DataFrame:
+    """
+    Orders the long frame into contiguous (Domain, Question, Country) series and
+    annotates wave gaps, so charts can slice it without per-series loops.
+
+    Adds:
+        series_id (int): one id per (Domain, Question, Country)
+        gap (float): years since the previous wave of the same series (NaN for the
+            first); on interpolated rows, the gap between the two waves they fill
+        segment (int): increments whenever gap > max_gap (max_gap <= 0 never breaks);
+            line charts use it as a detail channel so segments are not joined
+        interpolated (bool): True for rows filled in by interpolation
+
+    If interpolate is True, yearly points are filled in linearly between waves
+    inside each segment. SE is interpolated linearly too, (1-w) se0 + w se1:
+    the conservative choice (errors of the two waves taken as fully
+    correlated), so the band never narrows between measured waves; n is left empty.
+
+    max_gap is applied by split_segments, which can also re-segment a slice
+    of a frame built with max_gap=0 without rebuilding it.
+
+    A series runs across sheets (waves often live in separate sheets), and
+    interpolated rows take the Sheet of the earlier wave: to hide sheets,
+    build the series from the remaining rows rather than filtering the result.
+    """
+    df = long_df.sort_values(SERIES_KEYS + ["Year"], kind="stable").reset_index(drop=True)
+
+    series_id = df.groupby(SERIES_KEYS, sort=False, observed=True).ngroup().to_numpy()
+    years = df["Year"].to_numpy()
+
+    new_series = np.ones(len(df), dtype=bool)
+    new_series[1:] = series_id[1:] != series_id[:-1]
+
+    gap = np.empty(len(df), dtype=float)
+    gap[0:1] = np.nan
+    gap[1:] = years[1:] - years[:-1]
+    gap[new_series] = np.nan
+
+    df["series_id"] = series_id
+    df["gap"] = gap
+    df["segment"] = np.cumsum(new_series) - 1
+    df["interpolated"] = False
+
+    if interpolate:
+        df = _interpolate_segments(df)
+
+    return split_segments(df, max_gap)
+
+
+def split_segments(series_df: pd.DataFrame, max_gap: int) -> pd.DataFrame:
+    """
+    Breaks the series of a frame built with max_gap=0 (or of a slice of one
+    holding whole series or a contiguous year range of them) wherever a wave
+    follows the previous one after more than max_gap years, and drops the
+    interpolated rows across those gaps. Returns series_df itself when
+    max_gap <= 0; segment numbers are only unique within the result.
+    """
+    if max_gap <= 0 or series_df.empty:
+        return series_df
+    interpolated = series_df["interpolated"].to_numpy()
+    long_gap = series_df["gap"].to_numpy() > max_gap
+    keep = ~(interpolated & long_gap)
+
+    out = series_df[keep].copy()
+    series_id = out["series_id"].to_numpy()
+    breaks = long_gap[keep]
+    breaks[0] = True
+    breaks[1:] |= series_id[1:] != series_id[:-1]
+    out["segment"] = np.cumsum(breaks) - 1
+    return out
+
+
+def _interpolate_segments(df: pd.DataFrame) -> pd.DataFrame:
+    """Fills yearly rows between consecutive waves of the same segment (vectorized)."""
+    segment = df["segment"].to_numpy()
+    years = df["Year"].to_numpy()
+
+    # Pairs of consecutive rows inside one segment that are more than a year apart
+    left = np.flatnonzero((segment[1:] == segment[:-1]) & (years[1:] - years[:-1] > 1))
+    if len(left) == 0:
+        return df
+    right = left + 1
+
+    # One new row per missing year: repeat each pair (gap - 1) times
+    missing = years[right] - years[left] - 1
+    pair = np.repeat(np.arange(len(left)), missing)
+    offset = np.arange(len(pair)) - np.repeat(np.cumsum(missing) - missing, missing) + 1
+    span = (years[right] - years[left])[pair]
+    w = offset / span
+
+    lo = df.iloc[left[pair]].reset_index(drop=True)
+    hi = df.iloc[right[pair]].reset_index(drop=True)
+
+    filled = lo.copy()
+    filled["Year"] = years[left][pair] + offset
+    filled["value"] = (1 - w) * lo["value"].to_numpy() + w * hi["value"].to_numpy()
+    if "se" in df.columns:
+        filled["se"] = (1 - w) * lo["se"].to_numpy() + w * hi["se"].to_numpy()
+    if "n" in df.columns:
+        filled["n"] = np.nan
+    filled["gap"] = span.astype(float)
+    filled["interpolated"] = True
+
+    out = pd.concat([df, filled], ignore_index=True)
+    return out.sort_values(["series_id", "Year"], kind="stable").reset_index(drop=True)
+
+
+def years_by_question(series_df: pd.DataFrame) -> dict:
+    """{Question: sorted wave years} for x-axis ticks, computed once per dataset."""
+    observed = series_df[~series_df["interpolated"]]
+    return {
+        q: sorted(int(y) for y in ys)
+        for q, ys in observed.groupby("Question", observed=True)["Year"].unique().items()
+    }
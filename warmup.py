@@ -0,0 +1,278 @@
+"""
+Deploy-time warm-up of the dashboard's caches.
+
+Parses the dataset and the indicator definitions once, builds the domain
+index, the search index, the chart spec of the page every analyst lands on,
+and the frames behind the default view (series, preview sort index, movers,
+indicator matrix, correlations), and publishes them as one version of the
+shared store (see shared_store.py) in the cache directory. Server processes
+started with RT_SHARED_DATA_DIR pointing at the same directory map the
+dataset and these frames instead of paying for the first parse and builds
+themselves.
+
+Usage:
+    python warmup.py                    # at container build or boot
+    python warmup.py --check            # readiness probe: exit 0 once warm
+    python warmup.py --data other.parquet --cache-dir /srv/rt-cache
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from analytics import biggest_movers, correlation_matrix, indicator_matrix
+from charts import CHART_TYPES, GRAPH_STYLES, LAYOUTS, THEMES, axis_years, indicator_chart
+from data_loader import read_definitions
+from data_view import PREVIEW_SORT_COLUMNS, build_sort_index
+from intervals import CI_MODES, add_ci_columns, ci_columns
+from search_index import SearchIndex, domain_index
+from shared_store import current_version, publish, read_manifest
+from sources import find_source, load_source, source_fingerprint
+from timeseries import build_series, split_segments, years_by_question
+
+DEFAULT_DATA_STEM = "ResultswithSE"
+DEFINITIONS_FILE = "Indicator_Definitions.xlsx"
+WARMING_FILE = "WARMING"
+WARMING_MAX_AGE = 30 * 60  # a marker older than this is left over from a crashed warm-up
+
+# Sidebar defaults, i.e. the view of a fresh session
+DEFAULT_SETTINGS = {
+    "chart_type": CHART_TYPES[0],
+    "layout": LAYOUTS[0],
+    "graph_style": GRAPH_STYLES[0],
+    "theme": THEMES[0],
+    "error_bar_type": list(CI_MODES)[0],
+    "max_gap": 0,
+    "interpolate": False,
+}
+# Default correlation settings of the Indicator Correlations section
+DEFAULT_CORRELATION = {"weight": None, "min_periods": 5}
+
+# Frames every warmed version carries (the indicator matrix's "matrix_n" /
+# "matrix_se" only when the dataset has n / se columns)
+WARM_FRAMES = ["series", "sort_index", "movers", "matrix_value", "correlations", "correlation_pairs"]
+
+
+def view_key(domain: str, questions, countries, sheets, year_range, **settings) -> str:
+    """Canonical key of a chart view; the app looks pre-built specs up by it."""
+    return json.dumps(
+        {
+            "domain": domain,
+            "questions": list(questions),
+            "countries": sorted(countries),
+            "sheets": sorted(sheets),
+            "year_range": [int(y) for y in year_range],
+            **settings,
+        },
+        sort_keys=True,
+    )
+
+
+def default_series(long_df) -> pd.DataFrame:
+    """The series frame of the default settings, as RTNew.load_series builds it (max_gap is applied per view)."""
+    return add_ci_columns(build_series(long_df, interpolate=DEFAULT_SETTINGS["interpolate"]))
+
+
+def default_chart_specs(long_df, series_df: pd.DataFrame = None) -> dict:
+    """
+    {view_key: Vega-Lite spec} for the landing view: first domain, its first
+    indicator, all countries, sheets and years, default visual settings.
+    Built exactly as RTNew builds the single-indicator figure.
+    """
+    index = domain_index(long_df)
+    if not index:
+        return {}
+    domain = next(iter(index))
+    question = index[domain][0]
+    dom_df = long_df[long_df["Domain"] == domain]
+    countries = sorted(dom_df["Country"].unique())
+    sheets = sorted(dom_df["Sheet"].unique())
+    year_range = (int(dom_df["Year"].min()), int(dom_df["Year"].max()))
+
+    s = DEFAULT_SETTINGS
+    if series_df is None:
+        series_df = default_series(long_df)
+    plot_df = split_segments(series_df[
+        (series_df["Domain"] == domain)
+        & (series_df["Sheet"].isin(sheets))
+        & (series_df["Question"] == question)
+        & (series_df["Country"].isin(countries))
+        & (series_df["Year"].between(*year_range))
+    ], s["max_gap"])
+    chart = indicator_chart(
+        plot_df,
+        title_text=f"{question} – {domain}",
+        chart_type=s["chart_type"],
+        graph_style=s["graph_style"],
+        theme=s["theme"],
+        chart_years=axis_years([question], years_by_question(series_df), year_range),
+        ci_cols=ci_columns(s["error_bar_type"]),
+        interpolate=s["interpolate"],
+        countries=countries,
+        y_axis_title=question,
+        height=600,
+    )
+    spec = chart.to_dict()
+    # Altair's default theme adds a 300px continuous view size that st.altair_chart
+    # leaves out; drop it so the warm spec renders exactly like a cold one
+    view = spec.get("config", {}).get("view", {})
+    for key in ("continuousHeight", "continuousWidth"):
+        view.pop(key, None)
+    if "view" in spec.get("config", {}) and not view:
+        del spec["config"]["view"]
+    return {view_key(domain, [question], countries, sheets, year_range, **s): spec}
+
+
+def warm_artifacts(long_df, schema: dict, item_descs: dict) -> tuple:
+    """
+    Everything published with a warmed version.
+
+    Returns:
+        extras (dict): manifest entries (domain index, search index, wave
+            years, default chart specs)
+        frames (dict): {name: DataFrame}, see WARM_FRAMES
+    """
+    index = domain_index(long_df)
+    series_df = default_series(long_df)
+    matrices = indicator_matrix(long_df)
+    corr, pairs = correlation_matrix(matrices, **DEFAULT_CORRELATION)
+
+    try:
+        default_charts = default_chart_specs(long_df, series_df)
+    except Exception as e:
+        # Only saves the first chart build; the app builds it itself when missing
+        print(f"Default chart spec not pre-built: {e}", file=sys.stderr)
+        default_charts = {}
+
+    extras = {
+        "domain_index": index,
+        "search_index": SearchIndex(index, schema, item_descs).to_dict(),
+        "wave_years": years_by_question(series_df),
+        "default_charts": default_charts,
+    }
+    frames = {
+        "series": series_df,
+        "sort_index": pd.DataFrame(build_sort_index(series_df, PREVIEW_SORT_COLUMNS)),
+        "movers": biggest_movers(series_df),
+        "correlations": corr,
+        "correlation_pairs": pairs,
+    }
+    for key, matrix in matrices.items():
+        if matrix is not None:
+            frames[f"matrix_{key}"] = matrix
+    return extras, frames
+
+
+# -------------------------------------------------
+# Readiness
+# -------------------------------------------------
+def warming_in_progress(cache_dir: str) -> bool:
+    try:
+        return time.time() - os.stat(os.path.join(cache_dir, WARMING_FILE)).st_mtime < WARMING_MAX_AGE
+    except FileNotFoundError:
+        return False
+
+
+def claim_warming(cache_dir: str) -> bool:
+    """
+    Creates the WARMING marker atomically (O_EXCL), so exactly one process
+    parses and publishes at a time; False if another process holds it.
+    A marker left over from a crashed warm-up is replaced.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    marker = os.path.join(cache_dir, WARMING_FILE)
+    if os.path.exists(marker) and not warming_in_progress(cache_dir):
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+    try:
+        fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(f"{os.getpid()}\n")
+    return True
+
+
+def release_warming(cache_dir: str):
+    try:
+        os.remove(os.path.join(cache_dir, WARMING_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def is_ready(cache_dir: str, data_path: str) -> bool:
+    """
+    True when the live version was warmed from the current content of
+    data_path and carries every warm artifact.
+    """
+    version = current_version(cache_dir)
+    if version is None:
+        return False
+    manifest = read_manifest(cache_dir, version)
+    return (
+        manifest.get("fingerprint") == source_fingerprint(data_path)
+        and all(key in manifest for key in ("search_index", "wave_years", "default_charts"))
+        and set(WARM_FRAMES) <= set(manifest.get("frames", []))
+    )
+
+
+def warm(data_path: str, cache_dir: str, definitions_path: str = None) -> str:
+    """
+    Builds and publishes every warm artifact as the single writer of
+    cache_dir (see claim_warming). Returns the published version, or None
+    when another process is already warming.
+    """
+    if not claim_warming(cache_dir):
+        return None
+    try:
+        long_df, load_stats = load_source(data_path)
+        if definitions_path and os.path.exists(definitions_path):
+            schema, item_descs = read_definitions(definitions_path)
+        else:
+            schema, item_descs = {}, {}
+        extras, frames = warm_artifacts(long_df, schema, item_descs)
+        return publish(
+            cache_dir, long_df, load_stats, schema, item_descs, source_fingerprint(data_path),
+            extras=extras, frames=frames,
+        )
+    finally:
+        release_warming(cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help=f"data file (default: {DEFAULT_DATA_STEM}.* in the fastest format)")
+    parser.add_argument("--definitions", default=DEFINITIONS_FILE, help="indicator definitions workbook")
+    parser.add_argument("--cache-dir", default=os.environ.get("RT_SHARED_DATA_DIR"),
+                        help="cache directory (default: $RT_SHARED_DATA_DIR)")
+    parser.add_argument("--check", action="store_true", help="only report readiness (exit 0 when warm)")
+    args = parser.parse_args()
+
+    if not args.cache_dir:
+        sys.exit("No cache directory: pass --cache-dir or set RT_SHARED_DATA_DIR.")
+    data_path = args.data or find_source(".", DEFAULT_DATA_STEM)
+    if data_path is None:
+        sys.exit(f"No {DEFAULT_DATA_STEM} data file found in the current directory.")
+
+    if args.check:
+        ready = is_ready(args.cache_dir, data_path)
+        print("ready" if ready else "not ready")
+        sys.exit(0 if ready else 1)
+
+    start = time.perf_counter()
+    version = warm(data_path, args.cache_dir, args.definitions)
+    if version is None:
+        print(f"Another process is warming {args.cache_dir}; waiting for it")
+        while warming_in_progress(args.cache_dir):
+            time.sleep(2)
+        sys.exit(0 if is_ready(args.cache_dir, data_path) else 1)
+    print(f"Warmed {data_path} as {version} in {args.cache_dir} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()